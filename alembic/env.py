@@ -16,8 +16,11 @@ from saas_backend.auth.models import (
     APIKey,
     Blacklist,
     Anime,
+    AnimeTag,
+    CatalogState,
     WatchlistToAnime,
     Watchlist,
+    WatchlistStats,
 )
 
 # this is the Alembic Config object, which provides
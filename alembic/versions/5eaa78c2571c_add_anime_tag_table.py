@@ -0,0 +1,47 @@
+"""add anime_tag table
+
+Revision ID: 5eaa78c2571c
+Revises: 732d601b605a
+Create Date: 2025-05-03 18:12:40.512733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5eaa78c2571c'
+down_revision: Union[str, None] = '732d601b605a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    anime_tag = op.create_table('anime_tag',
+    sa.Column('anime_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['anime_id'], ['anime.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('anime_id', 'tag')
+    )
+    op.create_index(op.f('ix_anime_tag_tag'), 'anime_tag', ['tag'], unique=False)
+
+    # Backfill from the JSON tags column of the existing catalog
+    anime = sa.table('anime', sa.column('id', sa.Integer()), sa.column('tags', sa.JSON()))
+    rows = [
+        {'anime_id': anime_id, 'tag': tag}
+        for anime_id, tags in op.get_bind().execute(sa.select(anime.c.id, anime.c.tags))
+        for tag in dict.fromkeys(tag.strip().lower() for tag in tags or [])
+        if tag
+    ]
+
+    if rows:
+        op.bulk_insert(anime_tag, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_anime_tag_tag'), table_name='anime_tag')
+    op.drop_table('anime_tag')
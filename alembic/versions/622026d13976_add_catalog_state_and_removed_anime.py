@@ -0,0 +1,37 @@
+"""add catalog state and removed anime
+
+Revision ID: 622026d13976
+Revises: 9ab88ced3a37
+Create Date: 2025-05-10 09:41:55.207318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '622026d13976'
+down_revision: Union[str, None] = '9ab88ced3a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('anime', sa.Column('removed', sa.Boolean(), server_default=sa.false(), nullable=False))
+    catalog_state = op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_state, [{'id': 1, 'version': 1, 'updated_at': None}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_state')
+    with op.batch_alter_table('anime') as batch_op:
+        batch_op.drop_column('removed')
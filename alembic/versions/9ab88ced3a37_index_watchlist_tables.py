@@ -0,0 +1,60 @@
+"""index watchlist tables
+
+Revision ID: 9ab88ced3a37
+Revises: 5eaa78c2571c
+Create Date: 2025-05-04 11:27:03.918416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ab88ced3a37'
+down_revision: Union[str, None] = '5eaa78c2571c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep only the latest entry per (watchlist, anime) so the unique index can be built
+    op.execute(
+        'DELETE FROM watchlist_to_anime WHERE id NOT IN '
+        '(SELECT MAX(id) FROM watchlist_to_anime GROUP BY watchlist_id, anime_id)'
+    )
+    # Rows pointing at a missing user / watchlist are unreachable and would violate the
+    # new FKs. Watchlists go first, so the entries they leave behind are removed too
+    op.execute(
+        'DELETE FROM watchlist WHERE user_id IS NOT NULL '
+        'AND user_id NOT IN (SELECT id FROM "user")'
+    )
+    op.execute(
+        'DELETE FROM watchlist_to_anime WHERE watchlist_id IS NOT NULL '
+        'AND watchlist_id NOT IN (SELECT id FROM watchlist)'
+    )
+
+    with op.batch_alter_table('watchlist') as batch_op:
+        batch_op.create_foreign_key('fk_watchlist_user_id_user', 'user', ['user_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_watchlist_user_id'), ['user_id'], unique=False)
+
+    # anime_id gets no FK: anime rows are never deleted (dropped titles are only marked
+    # removed), and watchlist writes have always accepted ids outside the catalog
+    with op.batch_alter_table('watchlist_to_anime') as batch_op:
+        batch_op.create_foreign_key(
+            'fk_watchlist_to_anime_watchlist_id_watchlist', 'watchlist', ['watchlist_id'], ['id'], ondelete='CASCADE'
+        )
+        batch_op.create_index('ix_watchlist_to_anime_watchlist_id_anime_id', ['watchlist_id', 'anime_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('watchlist_to_anime') as batch_op:
+        batch_op.drop_index('ix_watchlist_to_anime_watchlist_id_anime_id')
+        batch_op.drop_constraint('fk_watchlist_to_anime_watchlist_id_watchlist', type_='foreignkey')
+
+    with op.batch_alter_table('watchlist') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_watchlist_user_id'))
+        batch_op.drop_constraint('fk_watchlist_user_id_user', type_='foreignkey')
@@ -0,0 +1,39 @@
+"""add watchlist stats
+
+Revision ID: b41c7d2e9f05
+Revises: 622026d13976
+Create Date: 2025-05-12 18:20:31.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7d2e9f05'
+down_revision: Union[str, None] = '622026d13976'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are built on first use, see saas_backend.anime.watchlist_stats
+    op.create_table('watchlist_stats',
+    sa.Column('watchlist_id', sa.Integer(), nullable=False),
+    sa.Column('catalog_version', sa.Integer(), nullable=True),
+    sa.Column('anime_count', sa.Integer(), nullable=False),
+    sa.Column('total_episodes', sa.Integer(), nullable=False),
+    sa.Column('tag_counts', sa.JSON(), nullable=False),
+    sa.Column('status_counts', sa.JSON(), nullable=False),
+    sa.Column('rating_counts', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['watchlist_id'], ['watchlist.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('watchlist_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('watchlist_stats')
@@ -0,0 +1,133 @@
+# STL
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Generic, TypeVar
+
+# PDM
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# LOCAL
+from saas_backend.auth.models import Anime, CatalogState
+
+T = TypeVar("T")
+
+CatalogVersion = int
+
+
+def get_catalog_version(connection: Session) -> CatalogVersion:
+    """Version of the anime catalog, used to invalidate catalog-derived caches."""
+    version = (
+        connection.query(CatalogState.version).filter(CatalogState.id == 1).scalar()
+    )
+
+    return version or 0
+
+
+def bump_catalog_version(connection: Session) -> CatalogVersion:
+    """Record a change to the anime table; committed with the caller's transaction."""
+    updated = (
+        connection.query(CatalogState)
+        .filter(CatalogState.id == 1)
+        .update(
+            {"version": CatalogState.version + 1, "updated_at": datetime.now()},
+            synchronize_session=False,
+        )
+    )
+
+    if not updated:
+        connection.add(CatalogState(id=1, version=1, updated_at=datetime.now()))
+        connection.flush()
+
+    return get_catalog_version(connection)
+
+
+def get_snapshot_key(connection: Session, version: CatalogVersion) -> str:
+    """
+    Name of the snapshots derived from catalog `version`: the version plus a digest
+    of when it was bumped and the size of the anime table, all read from indexed
+    columns, so a recreated database at the same version gets its own snapshots.
+    """
+    updated_at = (
+        connection.query(CatalogState.updated_at).filter(CatalogState.id == 1).scalar()
+    )
+    count, max_id = (
+        connection.query(func.count(Anime.id), func.max(Anime.id))
+        .filter(Anime.removed.is_(False))
+        .one()
+    )
+    digest = hashlib.blake2b(
+        repr((updated_at, count, max_id)).encode(), digest_size=8
+    ).hexdigest()
+
+    return f"{version}-{digest}"
+
+
+class IdIndex:
+    """
+    Anime id -> position in a sorted array of ids, answering like `dict.get`
+    without building a per-process dict over a shared array.
+    """
+
+    def __init__(self, anime_ids: np.ndarray):
+        self.anime_ids = anime_ids
+
+    def get(self, anime_id: int) -> int | None:
+        position = int(np.searchsorted(self.anime_ids, anime_id))
+
+        if position < len(self.anime_ids) and self.anime_ids[position] == anime_id:
+            return position
+
+        return None
+
+
+class CatalogCache(ABC, Generic[T]):
+    """
+    A process-wide structure derived from the anime catalog.
+
+    Subclasses implement `build`; the result is kept in memory and only rebuilt
+    when the catalog version changes.
+    """
+
+    def __init__(self):
+        # (version, value), replaced as a whole so readers never pair a value with
+        # another build's version
+        self._cached: tuple[CatalogVersion, T] | None = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def build(self, connection: Session, version: CatalogVersion) -> T:
+        """Derive the value from the catalog at `version`."""
+
+    def peek(self, version: CatalogVersion) -> T | None:
+        """The cached value if it was built for `version`, without touching the database."""
+        cached = self._cached
+
+        return cached[1] if cached is not None and cached[0] == version else None
+
+    def refresh(self, connection: Session) -> T:
+        version = get_catalog_version(connection)
+
+        with self._lock:
+            self._cached = (version, self.build(connection, version))
+            return self._cached[1]
+
+    def clear(self):
+        with self._lock:
+            self._cached = None
+
+    def get(self, connection: Session) -> T:
+        version = get_catalog_version(connection)
+        value = self.peek(version)
+
+        if value is not None:
+            return value
+
+        with self._lock:
+            if self._cached is None or self._cached[0] != version:
+                self._cached = (version, self.build(connection, version))
+
+            return self._cached[1]
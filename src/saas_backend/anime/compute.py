@@ -0,0 +1,186 @@
+# STL
+import os
+import asyncio
+import multiprocessing
+from typing import Any, TypeVar
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+# PDM
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.auth.database import DATABASE_URL, SessionLocal
+from saas_backend.anime.catalog import (
+    CatalogCache,
+    CatalogVersion,
+    get_catalog_version,
+)
+from saas_backend.anime.recommender import (
+    recommend,
+    recommendation_engine,
+    similarity_index_store,
+)
+from saas_backend.anime import search_index
+from saas_backend.anime.search_index import title_index
+
+T = TypeVar("T")
+
+# Worker processes for title matching and recommendations, 0 runs them on a
+# thread of the API process instead
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", min(4, os.cpu_count() or 1)))
+# Calls allowed to wait for a busy worker before new ones are answered with a 429
+COMPUTE_QUEUE_SIZE = int(os.getenv("COMPUTE_QUEUE_SIZE", 4 * max(COMPUTE_WORKERS, 1)))
+
+# Session factory of the process running the compute functions, see init_worker
+_sessions: Callable[[], Session] = SessionLocal
+
+
+def init_worker(database_url: str, pooled: bool):
+    """
+    Open the process's own database engine. Pool workers also build the catalog
+    caches up front, and score fuzzy searches on one thread unless SEARCH_WORKERS
+    says otherwise, as the pool already spreads searches over the cores.
+    """
+    global _sessions
+
+    if database_url != DATABASE_URL:
+        _sessions = sessionmaker(bind=create_engine(database_url))
+
+    if pooled:
+        search_index.SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 1))
+
+        with _sessions() as connection:
+            _ = title_index.get(connection)
+
+            if similarity_index_store.get(get_catalog_version(connection)) is None:
+                _ = recommendation_engine.get(connection)
+
+
+def catalog_value(cache: CatalogCache[T], version: CatalogVersion) -> T:
+    """The cache's value for `version`, only querying the database to rebuild it."""
+    value = cache.peek(version)
+
+    if value is None:
+        with _sessions() as connection:
+            value = cache.get(connection)
+
+    return value
+
+
+def search_titles(
+    version: CatalogVersion, queries: list[str], limit: int
+) -> list[list[int]]:
+    return catalog_value(title_index, version).search_many(queries, limit)
+
+
+def match_titles(
+    version: CatalogVersion, titles: list[str]
+) -> list[tuple[int, bool] | None]:
+    """TitleIndex.exact_match of every title."""
+    index = catalog_value(title_index, version)
+
+    return [index.exact_match(title) for title in titles]
+
+
+def recommend_anime(
+    version: CatalogVersion,
+    weighted_ids: list[tuple[int, float]],
+    excluded_ids: list[int],
+    limit: int,
+) -> list[int]:
+    # Prefer the precomputed neighbour index, otherwise the cached TF-IDF model
+    catalog = similarity_index_store.get(version) or catalog_value(
+        recommendation_engine, version
+    )
+
+    return recommend(catalog, weighted_ids, excluded_ids, limit)
+
+
+class ComputeExecutor:
+    """
+    Runs the CPU-bound search and recommendation functions above in a pool of
+    worker processes, which map the same catalog snapshots (see anime/snapshot.py),
+    so they neither hold the API's GIL nor block its event loop.
+
+    At most `workers + queue_size` calls are accepted at once per API process;
+    past that `run` answers 429 instead of letting the backlog grow.
+    """
+
+    def __init__(
+        self,
+        workers: int = COMPUTE_WORKERS,
+        queue_size: int = COMPUTE_QUEUE_SIZE,
+        database_url: str = DATABASE_URL,
+    ):
+        self.workers = workers
+        self.capacity = max(workers, 1) + queue_size
+        self.database_url = database_url
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+        if workers <= 0:
+            init_worker(database_url, pooled=False)
+
+    def start(self):
+        if self.workers <= 0 or self._pool is not None:
+            return
+
+        # Workers are spawned rather than forked, so they don't inherit the API
+        # process's open connections, event loop or threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.database_url, True),
+        )
+
+        # Spawn every worker now, so their caches are built before the first request
+        for _ in range(self.workers):
+            _ = self._pool.submit(os.getpid)
+
+        LOG.info(f"Started {self.workers} compute workers")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many search and recommendation requests, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(function, *args)
+
+            self.start()
+
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, function, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+compute = ComputeExecutor()
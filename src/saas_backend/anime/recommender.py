@@ -0,0 +1,257 @@
+# STL
+import os
+import time
+import threading
+from dataclasses import dataclass
+
+# PDM
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import norm as sparse_norm
+from sqlalchemy.orm import Session
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.auth.models import Anime
+from saas_backend.anime.catalog import (
+    IdIndex,
+    CatalogCache,
+    CatalogVersion,
+    get_snapshot_key,
+)
+from saas_backend.anime.snapshot import load_snapshot
+
+SIMILARITY_INDEX_PATH = os.getenv(
+    "SIMILARITY_INDEX_PATH", "./data/similarity-index.npz"
+)
+
+
+@dataclass(frozen=True)
+class RecommendationModel:
+    version: CatalogVersion
+    anime_ids: np.ndarray  # row index -> Anime.id, sorted
+    id_to_index: IdIndex
+    matrix: sparse.csr_matrix  # L2-normalised TF-IDF rows
+
+    @classmethod
+    def from_arrays(cls, version: CatalogVersion, arrays: dict[str, np.ndarray]):
+        # Wraps the (possibly memory-mapped) CSR buffers without copying them
+        matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=tuple(int(n) for n in arrays["shape"]),
+        )
+
+        return cls(
+            version=version,
+            anime_ids=arrays["anime_ids"],
+            id_to_index=IdIndex(arrays["anime_ids"]),
+            matrix=matrix,
+        )
+
+
+def fit_tfidf(rows: list[tuple[int, str | None]]) -> dict[str, np.ndarray]:
+    start = time.perf_counter()
+
+    anime_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    corpus = [row[1] or "" for row in rows]
+
+    try:
+        matrix = sparse.csr_matrix(
+            TfidfVectorizer(stop_words="english").fit_transform(corpus)
+        )
+    except ValueError:  # empty catalog or vocabulary
+        matrix = sparse.csr_matrix((len(rows), 0), dtype=np.float64)
+
+    elapsed = time.perf_counter() - start
+    LOG.info(f"Fitted recommendation model over {len(rows)} anime in {elapsed:.2f}s")
+
+    return {
+        "anime_ids": anime_ids,
+        "data": matrix.data,
+        "indices": matrix.indices,
+        "indptr": matrix.indptr,
+        "shape": np.asarray(matrix.shape, dtype=np.int64),
+    }
+
+
+class RecommendationEngine(CatalogCache[RecommendationModel]):
+    """
+    Holds a fitted TF-IDF model of the anime catalog.
+
+    The model is fitted once per catalog on the host and written to a snapshot
+    that every process maps, and only refitted when the catalog changes, so a
+    recommendation request only has to build a preference vector and run a
+    single sparse dot product against the shared matrix.
+    """
+
+    def build(
+        self, connection: Session, version: CatalogVersion
+    ) -> RecommendationModel:
+        def build_arrays():
+            rows = [
+                tuple(row)
+                for row in connection.query(Anime.id, Anime.reccomendation_string)
+                .filter(Anime.removed.is_(False))
+                .order_by(Anime.id)
+            ]
+
+            return fit_tfidf(rows)
+
+        # Only the process that fits the model reads the corpus
+        arrays = load_snapshot(
+            "tfidf", get_snapshot_key(connection, version), build_arrays
+        )
+
+        return RecommendationModel.from_arrays(version, arrays)
+
+
+def score_preferences(
+    model: RecommendationModel, input_indices: list[int], weights: list[float]
+) -> np.ndarray:
+    """Cosine similarity between the weighted mean of the input rows and every anime."""
+    weight_vector = np.asarray(weights, dtype=np.float64)
+    weight_vector /= weight_vector.sum()
+
+    preference = sparse.csr_matrix(weight_vector) @ model.matrix[input_indices]
+    norm = sparse_norm(preference)
+
+    if norm == 0:
+        return np.zeros(model.matrix.shape[0], dtype=np.float64)
+
+    return (model.matrix @ preference.T).toarray().ravel() / norm
+
+
+def select_top_k(
+    scores: np.ndarray, k: int, excluded: np.ndarray | None = None
+) -> np.ndarray:
+    """Positions of the `k` best scores, best first, skipping `excluded` positions."""
+    if excluded is not None:
+        scores = np.where(excluded, -np.inf, scores)
+        k = min(k, int(np.count_nonzero(~excluded)))
+
+    k = min(k, len(scores))
+
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def recommend(
+    catalog: "RecommendationModel | SimilarityIndex",
+    weighted_ids: list[tuple[int, float]],
+    excluded_ids: list[int],
+    limit: int,
+) -> list[int]:
+    """
+    Ids of the `limit` anime most similar to the weighted inputs, best first,
+    leaving out the inputs and `excluded_ids`. Inputs missing from the catalog are
+    ignored.
+    """
+    input_indices: list[int] = []
+    weights: list[float] = []
+
+    for anime_id, weight in weighted_ids:
+        idx = catalog.id_to_index.get(anime_id)
+
+        if idx is not None:
+            input_indices.append(idx)
+            weights.append(weight)
+
+    if not input_indices:
+        return []
+
+    if isinstance(catalog, SimilarityIndex):
+        # Aggregate the weighted neighbour lists of the inputs
+        candidates, similarities = catalog.aggregate(input_indices, weights)
+    else:
+        # Similarity between the weighted preference vector and all anime
+        similarities = score_preferences(catalog, input_indices, weights)
+        candidates = np.arange(len(similarities))
+
+    excluded = np.isin(candidates, input_indices) | np.isin(
+        catalog.anime_ids[candidates], np.asarray(excluded_ids, dtype=np.int64)
+    )
+    top = select_top_k(similarities, limit, excluded)
+
+    return [int(anime_id) for anime_id in catalog.anime_ids[candidates[top]]]
+
+
+@dataclass(frozen=True)
+class SimilarityIndex:
+    """Precomputed top-K neighbours per anime, see scripts/build_similarity_index.py."""
+
+    version: CatalogVersion
+    anime_ids: np.ndarray
+    id_to_index: dict[int, int]
+    neighbours: np.ndarray  # (n, k) row indices, best first
+    scores: np.ndarray  # (n, k) cosine similarities
+
+    def aggregate(
+        self, input_indices: list[int], weights: list[float]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Sum the weighted neighbour lists of the inputs into (candidates, scores)."""
+        weight_vector = np.asarray(weights, dtype=np.float32)
+        weight_vector /= weight_vector.sum()
+
+        candidates = self.neighbours[input_indices].ravel()
+        contributions = (self.scores[input_indices] * weight_vector[:, None]).ravel()
+
+        keep = contributions > 0
+        candidates, inverse = np.unique(candidates[keep], return_inverse=True)
+
+        return candidates, np.bincount(inverse, weights=contributions[keep])
+
+
+class SimilarityIndexStore:
+    """Loads the on-disk similarity index lazily and reloads it when the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: SimilarityIndex | None = None
+        self._mtime: float | None = None
+        self._lock = threading.Lock()
+
+    def get(self, version: CatalogVersion) -> SimilarityIndex | None:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._index = self._load()
+                    self._mtime = mtime
+
+        index = self._index
+
+        if index is None or index.version != version:
+            return None  # stale, fall back to the TF-IDF model
+
+        return index
+
+    def _load(self) -> SimilarityIndex | None:
+        try:
+            with np.load(self.path) as data:
+                anime_ids = data["anime_ids"]
+
+                return SimilarityIndex(
+                    version=int(data["version"]),
+                    anime_ids=anime_ids,
+                    id_to_index={
+                        int(anime_id): idx for idx, anime_id in enumerate(anime_ids)
+                    },
+                    neighbours=data["neighbours"],
+                    scores=data["scores"],
+                )
+        except (OSError, KeyError, ValueError) as e:
+            LOG.warning(f"Could not load similarity index from {self.path}: {e}")
+            return None
+
+
+recommendation_engine = RecommendationEngine()
+similarity_index_store = SimilarityIndexStore(SIMILARITY_INDEX_PATH)
@@ -1,7 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class UpdateWatchlist(BaseModel):
     anime: list[int]
     request: str
     status: str
+
+
+class BatchSearch(BaseModel):
+    queries: list[str] = Field(max_length=100)
+    limit: int = Field(default=5, ge=1, le=50)
@@ -1,15 +1,33 @@
 # PDM
 from fastapi import Query, Depends, APIRouter, HTTPException
-from rapidfuzz import fuzz, process
-from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
+from sqlalchemy import func, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # LOCAL
-from saas_backend.utils import to_dict
+from saas_backend.utils import to_dict, stream_json
 from saas_backend.anime.utils import get_recommendations, get_user_watched_anime
-from saas_backend.auth.models import User, Anime, Watchlist, WatchlistToAnime
-from saas_backend.auth.database import get_db
-from saas_backend.anime.request_models import UpdateWatchlist
+from saas_backend.anime.tags import normalize_tag
+from saas_backend.anime.watchlist import (
+    get_or_create_watchlist,
+    upsert_watchlist_entries,
+)
+from saas_backend.anime.catalog import get_catalog_version
+from saas_backend.anime.compute import compute, search_titles
+from saas_backend.anime.search_index import SEARCH_RESULT_LIMIT
+from saas_backend.anime.watchlist_stats import (
+    read_watchlist_stats,
+    track_watchlist_stats,
+)
+from saas_backend.auth.models import (
+    User,
+    Anime,
+    AnimeTag,
+    Watchlist,
+    WatchlistToAnime,
+)
+from saas_backend.auth.database import get_async_db
+from saas_backend.anime.request_models import BatchSearch, UpdateWatchlist
 from saas_backend.auth.user_manager.user_manager import UserManager
 
 router = APIRouter(prefix="/anime", tags=["anime"])
@@ -17,67 +35,90 @@ router = APIRouter(prefix="/anime", tags=["anime"])
 
 @router.get("/search")
 async def search_anime(
-    query: str, limit: int = 5, offset: int = 0, total_count: bool = False
+    query: str,
+    limit: int = 5,
+    offset: int = 0,
+    total_count: bool = False,
+    connection: AsyncSession = Depends(get_async_db),
 ):
-    connection: Session = next(get_db())
-
     print(f"Searching for {query} with limit {limit} and offset {offset}")
 
-    animes_from_db = connection.query(Anime).all()
-
-    anime_titles = [anime.title for anime in animes_from_db]
-    anime_extra_titles = [anime.extra_titles for anime in animes_from_db]
-
-    combined_titles = [
-        *anime_titles,
-        *[title for titles in anime_extra_titles for title in titles],
-    ]
-
-    print("Searching for fuzzy matches")
-    results = process.extract(query, combined_titles, scorer=fuzz.ratio, limit=limit)
-
-    results = sorted(results, key=lambda x: x[1], reverse=True)
-    results = [result[0] for result in results]
-
-    animes = connection.query(Anime).filter(Anime.title.in_(results)).all()
-    extra_animes = (
-        connection.query(Anime).filter(Anime.extra_titles.like(f"%{query}%")).all()
+    # Match against the title index in a compute worker, then only load the
+    # requested page. The result list doesn't depend on the page, so every page
+    # is cut from the same list and agrees on its total count
+    version = await connection.run_sync(get_catalog_version)
+    [anime_ids] = await compute.run(
+        search_titles, version, [query], SEARCH_RESULT_LIMIT
     )
+    page_ids = anime_ids[offset : offset + limit]
 
-    animes = list(
-        {anime.title.lower(): anime for anime in [*animes, *extra_animes]}.values()
-    )
+    animes_by_id = {
+        anime.id: anime
+        for anime in await connection.scalars(
+            select(Anime).where(Anime.id.in_(page_ids))
+        )
+    }
+    animes = [to_dict(animes_by_id[id]) for id in page_ids if id in animes_by_id]
 
     if total_count:
         return {
-            "animes": [to_dict(anime) for anime in animes][offset : offset + limit],
-            "total_count": len(animes),
+            "animes": animes,
+            "total_count": len(anime_ids),
         }
 
-    return [to_dict(anime) for anime in animes][offset : offset + limit]
+    return animes
 
 
-@router.get("/search/tags")
-async def search_anime_tags(query: str, limit: int = 10, offset: int = 0):
-    connection = next(get_db())
+@router.post("/search/batch")
+async def batch_search_anime(
+    request: BatchSearch, connection: AsyncSession = Depends(get_async_db)
+):
+    version = await connection.run_sync(get_catalog_version)
+    results = await compute.run(search_titles, version, request.queries, request.limit)
+    results = [anime_ids[: request.limit] for anime_ids in results]
+
+    animes_by_id = {
+        anime.id: to_dict(anime)
+        for anime in await connection.scalars(
+            select(Anime).where(
+                Anime.id.in_({id for anime_ids in results for id in anime_ids})
+            )
+        )
+    }
+
+    return [
+        {
+            "query": query,
+            "animes": [animes_by_id[id] for id in anime_ids if id in animes_by_id],
+        }
+        for query, anime_ids in zip(request.queries, results)
+    ]
+
 
+@router.get("/search/tags")
+async def search_anime_tags(
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    connection: AsyncSession = Depends(get_async_db),
+):
     print(f"Searching for {query} with limit {limit} and offset {offset}")
 
-    total_count = (
-        connection.query(Anime)
-        .filter(Anime.tags.like(f"%{query}%"))
-        .filter(Anime.status.notlike("UPCOMING"))
-        .count()
+    # Served from the indexed anime_tag table instead of LIKE over the JSON column
+    animes_with_tag = (
+        select(Anime)
+        .join(AnimeTag, AnimeTag.anime_id == Anime.id)
+        .where(AnimeTag.tag == normalize_tag(query))
+        .where(Anime.removed.is_(False))
+        .where(Anime.status.notlike("UPCOMING"))
     )
 
-    animes_with_tag = (
-        connection.query(Anime)
-        .filter(Anime.tags.like(f"%{query}%"))
-        .filter(Anime.status.notlike("UPCOMING"))
-        .order_by(Anime.rating.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    total_count = await connection.scalar(
+        select(func.count()).select_from(animes_with_tag.subquery())
+    )
+
+    animes_with_tag = await connection.scalars(
+        animes_with_tag.order_by(Anime.rating.desc()).offset(offset).limit(limit)
     )
 
     return {
@@ -92,9 +133,9 @@ async def get_anime_recommendations(
     limit: int = Query(default=10),
     from_watchlist: bool = Query(default=False),
     user: User = Depends(UserManager.get_user_from_header),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    watched_anime = get_user_watched_anime(user.id, db)
+    watched_anime = await get_user_watched_anime(user.id, db)
 
     return await get_recommendations(
         db,
@@ -105,93 +146,69 @@ async def get_anime_recommendations(
 
 
 @router.get("/watchlists")
-async def get_watchlists(user: User = Depends(UserManager.get_user_from_header)):
-    connection = next(get_db())
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()
-
-    if not watchlist:
-        watchlist = Watchlist(user_id=user.id)
-        connection.add(watchlist)
-        connection.commit()
-
-    watchlist_to_anime = (
-        connection.query(WatchlistToAnime)
-        .filter(WatchlistToAnime.watchlist_id == watchlist.id)
-        .all()
+async def get_watchlists(
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
+):
+    watchlist = await get_or_create_watchlist(connection, user.id)
+    await connection.commit()
+
+    # Only the columns the watchlist page shows, the recommendation string and the
+    # alternative titles are large and unused there
+    rows = await connection.execute(
+        select(
+            Anime.id,
+            Anime.title,
+            Anime.description,
+            Anime.image_url,
+            Anime.rating,
+            Anime.episode_count,
+            Anime.status,
+            Anime.year,
+            Anime.season,
+            Anime.tags,
+            WatchlistToAnime.status.label("watchlist_status"),
+            WatchlistToAnime.rating.label("user_rating"),
+        )
+        .join(WatchlistToAnime, WatchlistToAnime.anime_id == Anime.id)
+        .where(WatchlistToAnime.watchlist_id == watchlist.id)
+        .order_by(Anime.id)
     )
 
-    animes = [
-        {"id": anime.anime_id, "status": anime.status, "user_rating": anime.rating}
-        for anime in watchlist_to_anime
-    ]
-
-    watchlist_animes = (
-        connection.query(Anime)
-        .filter(Anime.id.in_([anime["id"] for anime in animes]))
-        .all()
-    )
-
-    # Create a dictionary to map anime IDs to their status
-    anime_status_map = {
-        anime["id"]: {"status": anime["status"], "user_rating": anime["user_rating"]}
-        for anime in animes
-    }
-
-    # Include the status in the response
-    anime_with_status = [
-        {
-            **to_dict(anime),
-            "watchlist_status": anime_status_map.get(anime.id, {}).get("status"),
-            "user_rating": anime_status_map.get(anime.id, {}).get("user_rating"),
-        }
-        for anime in watchlist_animes
-    ]
-
-    return JSONResponse(
-        status_code=200,
-        content={
-            "anime": anime_with_status,
-            "user_id": user.id,
-            "watchlist_id": watchlist.id if watchlist else None,
-        },
+    return StreamingResponse(
+        stream_json(
+            {"user_id": user.id, "watchlist_id": watchlist.id},
+            "anime",
+            (dict(row) for row in rows.mappings()),
+        ),
+        media_type="application/json",
     )
 
 
 @router.put("/watchlists")
 async def update_watchlists(
-    request: UpdateWatchlist, user: User = Depends(UserManager.get_user_from_header)
+    request: UpdateWatchlist,
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
 ):
-    connection = next(get_db())
-
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()
-
-    if not watchlist:
-        new_watchlist = Watchlist(user_id=user.id)
-        connection.add(new_watchlist)
-        connection.commit()  # Commit to ensure the new watchlist has an ID
-        watchlist = new_watchlist
+    watchlist = await get_or_create_watchlist(connection, user.id)
 
     if request.request == "update":
-        for anime in request.anime:
-            anime_to_watchlist = (
-                connection.query(WatchlistToAnime)
-                .filter(
-                    WatchlistToAnime.watchlist_id == watchlist.id,
-                    WatchlistToAnime.anime_id == anime,
-                )
-                .first()
-            )  #
-
-            if anime_to_watchlist:
-                anime_to_watchlist.status = request.status  # type: ignore
-            else:
-                anime_to_watchlist = WatchlistToAnime(
-                    watchlist_id=watchlist.id, anime_id=anime, status=request.status
-                )
-                connection.add(anime_to_watchlist)
-
-    connection.commit()
-    connection.close()
+        async with track_watchlist_stats(connection, watchlist.id, request.anime):
+            await upsert_watchlist_entries(
+                connection,
+                [
+                    {
+                        "watchlist_id": watchlist.id,
+                        "anime_id": anime,
+                        "status": request.status,
+                    }
+                    for anime in request.anime
+                ],
+                update_columns=["status"],
+            )
+
+    await connection.commit()
 
     return JSONResponse(status_code=200, content={"message": "Watchlist updated"})
 
@@ -199,114 +216,110 @@ async def update_watchlists(
 @router.delete("/watchlists")
 async def delete_watchlist_entry(
     anime_id: int,
-    _: User = Depends(UserManager.get_user_from_header),
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
 ):
-    connection = next(get_db())
-    watchlist_to_anime = (
-        connection.query(WatchlistToAnime)
-        .filter(WatchlistToAnime.anime_id == anime_id)
-        .first()
+    watchlist = await connection.scalar(
+        select(Watchlist).where(Watchlist.user_id == user.id)
     )
 
-    if not watchlist_to_anime:
+    if not watchlist:
         raise HTTPException(status_code=404, detail="Watchlist entry not found")
 
-    connection.delete(watchlist_to_anime)
-    connection.commit()
+    async with track_watchlist_stats(connection, watchlist.id, [anime_id]):
+        deleted = await connection.execute(
+            delete(WatchlistToAnime).where(
+                WatchlistToAnime.watchlist_id == watchlist.id,
+                WatchlistToAnime.anime_id == anime_id,
+            )
+        )
+
+    if not deleted.rowcount:
+        raise HTTPException(status_code=404, detail="Watchlist entry not found")
+
+    await connection.commit()
 
     return JSONResponse(status_code=200, content={"message": "Watchlist entry deleted"})
 
 
 @router.get("/stats")
-async def get_anime_stats(user: User = Depends(UserManager.get_user_from_header)):
-    connection = next(get_db())
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()
+async def get_anime_stats(
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
+):
+    # Kept up to date by the watchlist write paths, see anime/watchlist_stats.py
+    stats = await read_watchlist_stats(connection, user.id)
 
-    if not watchlist:
+    if not stats:
         return JSONResponse(status_code=404, content={"message": "No watchlist found"})
 
-    # Fetch all anime in the user's watchlist
-    watchlist_to_anime = (
-        connection.query(WatchlistToAnime)
-        .filter(WatchlistToAnime.watchlist_id == watchlist.id)
-        .all()
-    )
-
-    # Get anime details
-    anime_ids = [entry.anime_id for entry in watchlist_to_anime]
-    animes = connection.query(Anime).filter(Anime.id.in_(anime_ids)).all()
-
-    # Calculate statistics
-    total_anime_watched = len(animes)
-    total_length = sum(anime.episode_count for anime in animes)
     average_length = (
-        total_length / total_anime_watched if total_anime_watched > 0 else 0
+        stats.total_episodes / stats.anime_count if stats.anime_count > 0 else 0
     )
 
-    # Calculate most common genres
-    genre_count = {}
-    for anime in animes:
-        for genre in anime.tags:
-            genre_count[genre] = genre_count.get(genre, 0) + 1
-
-    most_common_genres = sorted(genre_count.items(), key=lambda item: item[1], reverse=True)  # type: ignore
+    most_common_genres = sorted(
+        stats.tag_counts.items(), key=lambda item: (-item[1], item[0])
+    )
 
     return JSONResponse(
         status_code=200,
         content={
-            "total_anime_watched": total_anime_watched,
+            "total_anime_watched": stats.anime_count,
             "average_length": average_length,
             "most_common_genres": most_common_genres,
+            "total_episodes": stats.total_episodes,
+            "status_breakdown": stats.status_counts,
+            "rating_histogram": stats.rating_counts,
         },
     )
 
 
 @router.get("/rate")
 async def rate_anime(
-    anime_id: int, rating: int, user: User = Depends(UserManager.get_user_from_header)
+    anime_id: int,
+    rating: int,
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
 ):
-    connection = next(get_db())
-    anime = connection.query(Anime).filter(Anime.id == anime_id).first()
+    anime = await connection.scalar(select(Anime).where(Anime.id == anime_id))
 
     if not anime:
         raise HTTPException(status_code=404, detail="Anime not found")
 
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()
+    watchlist = await connection.scalar(
+        select(Watchlist).where(Watchlist.user_id == user.id)
+    )
 
     if not watchlist:
         raise HTTPException(status_code=404, detail="Watchlist not found")
 
-    watchlist_to_anime = (
-        connection.query(WatchlistToAnime)
-        .filter(
-            WatchlistToAnime.anime_id == anime_id,
-            WatchlistToAnime.watchlist_id == watchlist.id,
+    async with track_watchlist_stats(connection, watchlist.id, [anime_id]):
+        updated = await connection.execute(
+            update(WatchlistToAnime)
+            .where(
+                WatchlistToAnime.watchlist_id == watchlist.id,
+                WatchlistToAnime.anime_id == anime_id,
+            )
+            .values(rating=rating)
         )
-        .first()
-    )
 
-    if not watchlist_to_anime:
+    if not updated.rowcount:
         raise HTTPException(status_code=404, detail="Watchlist entry not found")
 
-    watchlist_to_anime.rating = rating  # type: ignore
-
-    connection.commit()
+    await connection.commit()
 
     return JSONResponse(status_code=200, content={"message": "Anime rated"})
 
 
 @router.get("/{id}")
-async def get_anime(id: int):
-    connection = next(get_db())
-    anime = connection.query(Anime).filter(Anime.id == id).first()
+async def get_anime(id: int, connection: AsyncSession = Depends(get_async_db)):
+    anime = await connection.scalar(select(Anime).where(Anime.id == id))
 
     if anime is None:
         raise HTTPException(status_code=404, detail="Anime not found")
 
-    anime_to_watchlist = (
-        connection.query(WatchlistToAnime)
-        .filter(WatchlistToAnime.anime_id == id)
-        .first()
+    anime_to_watchlist = await connection.scalar(
+        select(WatchlistToAnime).where(WatchlistToAnime.anime_id == id).limit(1)
     )
 
     if anime_to_watchlist:
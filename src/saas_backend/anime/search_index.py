@@ -0,0 +1,321 @@
+# STL
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+
+# PDM
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+from sqlalchemy.orm import Session
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.auth.models import Anime
+from saas_backend.anime.catalog import (
+    CatalogCache,
+    CatalogVersion,
+    get_snapshot_key,
+)
+from saas_backend.anime.snapshot import load_snapshot
+
+TITLE_SEPARATOR = "\n"
+
+# rapidfuzz worker threads per cdist call, -1 uses every core; compute pool workers
+# default to 1, see compute.init_worker
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", -1))
+# Queries scored per cdist call, bounds the (queries x titles) score matrix
+SEARCH_BATCH_SIZE = int(os.getenv("SEARCH_BATCH_SIZE", 32))
+# Titles shortlisted by the trigram prefilter before fuzzy scoring, 0 disables it
+SEARCH_CANDIDATE_CAP = int(os.getenv("SEARCH_CANDIDATE_CAP", 1000))
+# Fuzzy matches ranked per /anime/search query, the list its pages are cut from
+SEARCH_RESULT_LIMIT = int(os.getenv("SEARCH_RESULT_LIMIT", 100))
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class TitleIndex:
+    """
+    Flat, preprocessed array of every title and synonym in the catalog, held in
+    arrays that can be memory-mapped from a catalog snapshot and shared between
+    processes.
+
+    Title `i` is `title_blob[title_offsets[i] : title_offsets[i + 1] - 1]`, the
+    titles being UTF-8 encoded and joined by TITLE_SEPARATOR, and belongs to
+    anime `title_anime_ids[i]`. Main titles come first, synonyms start at
+    `synonym_start`, so substring matches on synonyms are found with a single
+    regex scan over the tail of the blob. Every title is listed in a
+    character-trigram inverted index used to shortlist fuzzy candidates, and
+    `title_order` sorts the titles for exact lookups, a main title coming before
+    an equal synonym.
+    """
+
+    version: CatalogVersion
+    title_blob: np.ndarray  # uint8
+    title_offsets: np.ndarray  # start byte of every title, plus one past the end
+    title_anime_ids: np.ndarray
+    synonym_start: int
+    trigram_keys: np.ndarray  # sorted distinct trigrams
+    posting_offsets: (
+        np.ndarray
+    )  # trigram_keys[k] -> postings[offsets[k]:offsets[k + 1]]
+    postings: np.ndarray  # sorted title indices of every trigram
+    title_order: np.ndarray  # title indices sorted by title, then index
+
+    @classmethod
+    def from_arrays(cls, version: CatalogVersion, arrays: dict[str, np.ndarray]):
+        return cls(
+            version=version,
+            synonym_start=int(arrays["synonym_start"]),
+            **{
+                name: array for name, array in arrays.items() if name != "synonym_start"
+            },
+        )
+
+    @property
+    def title_count(self) -> int:
+        return len(self.title_anime_ids)
+
+    def title(self, title_index: int) -> str:
+        start, end = self.title_offsets[title_index : title_index + 2]
+        return self.title_blob[start : end - 1].tobytes().decode()
+
+    def titles(self) -> list[str]:
+        """Every title, decoded for a full scan; not kept, so the blob stays shared."""
+        if not self.title_count:
+            return []
+
+        return self.title_blob.tobytes().decode().split(TITLE_SEPARATOR)
+
+    def exact_match(self, title: str) -> tuple[int, bool] | None:
+        """(anime id, matched a synonym) of the title equal to `title` once both
+        are preprocessed, or None."""
+        processed = default_process(title)
+
+        if not processed:
+            return None
+
+        position = bisect_left(self.title_order, processed, key=self.title)
+
+        if position == len(self.title_order):
+            return None
+
+        title_index = int(self.title_order[position])
+
+        if self.title(title_index) != processed:
+            return None
+
+        return int(self.title_anime_ids[title_index]), title_index >= self.synonym_start
+
+    def fuzzy_matches(self, query: str, limit: int) -> list[int]:
+        """Anime ids whose best title is closest to `query`, best first."""
+        return self.fuzzy_matches_many([query], limit)[0]
+
+    def fuzzy_matches_many(self, queries: list[str], limit: int) -> list[list[int]]:
+        """Fuzzy matches for every query, best first."""
+        processed = [default_process(query) for query in queries]
+        results: list[list[int]] = [[] for _ in queries]
+
+        if limit <= 0 or not self.title_count:
+            return results
+
+        full_scan: list[int] = []
+
+        for i, query in enumerate(processed):
+            if not query:
+                continue
+
+            candidates = self.candidates(query)
+
+            if candidates is None:
+                full_scan.append(i)
+                continue
+
+            scores = process.cdist(
+                [query],
+                [self.title(title_index) for title_index in candidates],
+                scorer=fuzz.ratio,
+                processor=None,
+                dtype=np.float32,
+            )[0]
+            results[i] = self._top_anime_ids(scores, candidates, limit)
+
+        # Queries without a shortlist are scored against every title across cores
+        titles = self.titles() if full_scan else []
+
+        for chunk_start in range(0, len(full_scan), SEARCH_BATCH_SIZE):
+            chunk = full_scan[chunk_start : chunk_start + SEARCH_BATCH_SIZE]
+            scores = process.cdist(
+                [processed[i] for i in chunk],
+                titles,
+                scorer=fuzz.ratio,
+                processor=None,
+                dtype=np.float32,
+                workers=SEARCH_WORKERS,
+            )
+
+            for i, row in zip(chunk, scores):
+                results[i] = self._top_anime_ids(row, None, limit)
+
+        return results
+
+    def candidates(self, processed_query: str) -> np.ndarray | None:
+        """
+        Title indices sharing the most trigrams with the query, capped at
+        SEARCH_CANDIDATE_CAP. None means the query has to scan every title.
+        """
+        if SEARCH_CANDIDATE_CAP <= 0 or self.title_count <= SEARCH_CANDIDATE_CAP:
+            return None
+
+        query_trigrams = np.array(sorted(trigrams(processed_query)))
+        positions = np.searchsorted(self.trigram_keys, query_trigrams)
+        found = positions < len(self.trigram_keys)
+        found[found] = self.trigram_keys[positions[found]] == query_trigrams[found]
+        keys = positions[found]
+
+        if not len(keys):
+            return None
+
+        postings = [
+            self.postings[self.posting_offsets[key] : self.posting_offsets[key + 1]]
+            for key in keys
+        ]
+
+        title_indices, counts = np.unique(np.concatenate(postings), return_counts=True)
+
+        if len(title_indices) > SEARCH_CANDIDATE_CAP:
+            best = np.argpartition(-counts, SEARCH_CANDIDATE_CAP - 1)
+            title_indices = np.sort(title_indices[best[:SEARCH_CANDIDATE_CAP]])
+
+        return title_indices
+
+    def _top_anime_ids(
+        self, scores: np.ndarray, title_indices: np.ndarray | None, limit: int
+    ) -> list[int]:
+        # Several titles can point at the same anime, over-fetch before deduping
+        fetch = min(limit * 4, len(scores))
+
+        top = np.argpartition(-scores, fetch - 1)[:fetch]
+        top = top[np.lexsort((top, -scores[top]))]
+
+        if title_indices is not None:
+            top = title_indices[top]
+
+        return list(dict.fromkeys(self.title_anime_ids[top].tolist()))[:limit]
+
+    def synonym_matches(self, query: str) -> list[int]:
+        """Anime ids with a synonym containing `query`, in catalog order."""
+        processed = default_process(query)
+
+        if not processed:
+            return []
+
+        # The separator never survives preprocessing, so matches never span titles
+        pattern = re.compile(re.escape(processed.encode()))
+        positions = np.fromiter(
+            (
+                match.start()
+                for match in pattern.finditer(
+                    self.title_blob, int(self.title_offsets[self.synonym_start])
+                )
+            ),
+            dtype=np.int64,
+        )
+
+        title_indices = np.searchsorted(self.title_offsets, positions, side="right") - 1
+        anime_ids = self.title_anime_ids[title_indices]
+
+        return list(dict.fromkeys(int(anime_id) for anime_id in anime_ids))
+
+    def search(self, query: str, limit: int) -> list[int]:
+        """Fuzzy title matches followed by synonym substring matches, deduplicated."""
+        return self.search_many([query], limit)[0]
+
+    def search_many(self, queries: list[str], limit: int) -> list[list[int]]:
+        return [
+            list(dict.fromkeys([*fuzzy, *self.synonym_matches(query)]))
+            for query, fuzzy in zip(queries, self.fuzzy_matches_many(queries, limit))
+        ]
+
+
+def build_title_arrays(rows: list[tuple[int, str | None, list[str] | None]]):
+    start = time.perf_counter()
+
+    titles: list[str] = []
+    title_anime_ids: list[int] = []
+
+    for anime_id, title, _ in rows:
+        titles.append(default_process(title or ""))
+        title_anime_ids.append(anime_id)
+
+    synonym_start = len(titles)
+
+    for anime_id, _, extra_titles in rows:
+        for extra_title in extra_titles or []:
+            # default_process strips the separator, so matches never span synonyms
+            titles.append(default_process(extra_title))
+            title_anime_ids.append(anime_id)
+
+    postings: defaultdict[str, list[int]] = defaultdict(list)
+
+    for title_index, title in enumerate(titles):
+        for trigram in trigrams(title):
+            postings[trigram].append(title_index)
+
+    trigram_keys = sorted(postings)
+    encoded = [title.encode() for title in titles]
+    lengths = np.fromiter((len(title) + 1 for title in encoded), dtype=np.int64)
+
+    elapsed = time.perf_counter() - start
+    LOG.info(f"Built title index with {len(titles)} titles in {elapsed:.2f}s")
+
+    return {
+        "title_blob": np.frombuffer(
+            TITLE_SEPARATOR.encode().join(encoded), dtype=np.uint8
+        ),
+        "title_offsets": np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+        "title_anime_ids": np.asarray(title_anime_ids, dtype=np.int64),
+        "synonym_start": np.asarray(synonym_start, dtype=np.int64),
+        "trigram_keys": np.asarray(trigram_keys, dtype="<U3"),
+        "posting_offsets": np.concatenate(
+            ([0], np.cumsum([len(postings[key]) for key in trigram_keys]))
+        ).astype(np.int64),
+        "postings": np.asarray(
+            [title_index for key in trigram_keys for title_index in postings[key]],
+            dtype=np.int32,
+        ),
+        "title_order": np.asarray(
+            sorted(range(len(titles)), key=titles.__getitem__), dtype=np.int32
+        ),
+    }
+
+
+class TitleIndexStore(CatalogCache[TitleIndex]):
+    def build(self, connection: Session, version: CatalogVersion) -> TitleIndex:
+        def build_arrays():
+            rows = [
+                tuple(row)
+                for row in connection.query(Anime.id, Anime.title, Anime.extra_titles)
+                .filter(Anime.removed.is_(False))
+                .order_by(Anime.id)
+            ]
+
+            return build_title_arrays(rows)
+
+        # Built once per catalog on the host, every process maps the same snapshot;
+        # only the process that builds it reads the titles
+        arrays = load_snapshot(
+            "titles", get_snapshot_key(connection, version), build_arrays
+        )
+
+        return TitleIndex.from_arrays(version, arrays)
+
+
+title_index = TitleIndexStore()
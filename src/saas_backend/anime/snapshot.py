@@ -0,0 +1,205 @@
+# STL
+import os
+import json
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
+from collections.abc import Callable, Generator
+
+# PDM
+import numpy as np
+
+# LOCAL
+from saas_backend.logger import LOG
+
+# Where catalog snapshots are written, shared by every process on the host
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "./data/catalog-snapshots")
+
+MANIFEST = "arrays.json"
+# Every process mapping a snapshot holds a shared flock on this file
+LEASE = "lease"
+# Prefix of the directories snapshots are written into before being renamed
+STAGING = ".staging-"
+
+Arrays = dict[str, np.ndarray]
+
+
+class Lease:
+    """
+    Shared lock on a snapshot directory, held for as long as any of its mapped
+    arrays is alive. The kernel drops it when the process exits, so a snapshot
+    nobody can lock exclusively is still mapped somewhere.
+    """
+
+    def __init__(self, path: str):
+        self.fd = -1
+        self.fd = os.open(os.path.join(path, LEASE), os.O_RDONLY)
+        fcntl.flock(self.fd, fcntl.LOCK_SH)
+
+    def __del__(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+
+
+def load_snapshot(
+    kind: str,
+    key: str,
+    build: Callable[[], Arrays],
+    directory: str | None = None,
+) -> Arrays:
+    """
+    The arrays of the `kind` snapshot named `key`, memory-mapped read-only so every
+    process attaching to it shares the same physical pages. The first process to
+    ask builds it with `build` and writes it, while the others wait for it and
+    attach; if it can't be written the built arrays are returned as a private copy.
+    """
+    directory = directory or CATALOG_SNAPSHOT_DIR
+    path = os.path.join(directory, f"{kind}-{key}")
+
+    arrays = attach(path)
+
+    if arrays is not None:
+        return arrays
+
+    with build_lock(path):
+        arrays = attach(path)
+
+        if arrays is not None:
+            return arrays
+
+        arrays = build()
+
+        try:
+            write(path, arrays)
+        except OSError as e:
+            LOG.warning(f"Could not write catalog snapshot {path}: {e}")
+            return arrays
+
+    arrays = attach(path) or arrays
+    remove_unused(directory, kind, path)
+
+    return arrays
+
+
+@contextmanager
+def build_lock(path: str) -> Generator[None, None, None]:
+    """
+    Exclusive flock on `path`.lock, so one process builds the snapshot at a time.
+    When the lock file can't be created the build goes ahead unlocked.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        LOG.warning(f"Could not lock catalog snapshot {path}: {e}")
+        yield
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def attach(path: str) -> Arrays | None:
+    try:
+        # Taken before reading, so the directory can't be removed while it's mapped
+        lease = Lease(path)
+    except OSError:
+        return None
+
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            names: list[str] = json.load(f)
+
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in names
+        }
+    except (OSError, ValueError) as e:
+        LOG.warning(f"Could not attach catalog snapshot {path}: {e}")
+        return None
+
+    for array in arrays.values():
+        # Views and matrices built over the arrays keep them, and so the lease, alive
+        array._lease = lease
+
+    return arrays
+
+
+def write(path: str, arrays: Arrays):
+    """Write into a temporary directory renamed into place, so readers never see a
+    partial snapshot. When another process got there first its copy is kept."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=directory, prefix=STAGING)
+    # Locked while it's written, so remove_unused only clears what a crash left
+    fd = os.open(staging, os.O_RDONLY)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(list(arrays), f)
+
+        open(os.path.join(staging, LEASE), "w").close()
+        os.rename(staging, path)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+        if not os.path.isdir(path):
+            raise
+
+        LOG.info(f"Catalog snapshot {path} was already written by another process")
+        return
+    finally:
+        os.close(fd)
+
+    LOG.info(f"Wrote catalog snapshot {path}")
+
+
+def remove_unused(directory: str, kind: str, path: str):
+    """
+    Delete the other snapshots of `kind` that no live process has mapped, their
+    build locks, and staging directories left behind by a crashed write.
+    """
+    for entry in os.scandir(directory):
+        if entry.name.startswith(STAGING):
+            remove_unlocked(entry.path, entry.path)
+        elif not entry.name.startswith(f"{kind}-") or entry.path in (
+            path,
+            f"{path}.lock",
+        ):
+            continue
+        elif entry.name.endswith(".lock"):
+            remove_unlocked(entry.path, entry.path)
+        else:
+            remove_unlocked(os.path.join(entry.path, LEASE), entry.path)
+
+
+def remove_unlocked(lock_path: str, path: str):
+    """Delete `path` unless another process holds a flock on `lock_path`."""
+    try:
+        fd = os.open(lock_path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return  # still in use
+
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.unlink(path)
+    except FileNotFoundError:
+        pass  # removed by another process
+    finally:
+        os.close(fd)
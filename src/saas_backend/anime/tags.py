@@ -0,0 +1,35 @@
+# STL
+from collections.abc import Iterable
+
+# PDM
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+# LOCAL
+from saas_backend.auth.models import AnimeTag
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lower()
+
+
+def replace_anime_tags(
+    connection: Session, tags_by_anime_id: dict[int, Iterable[str]]
+) -> None:
+    """Replace the anime_tag rows of the given anime with their normalized tags."""
+    if not tags_by_anime_id:
+        return
+
+    _ = connection.execute(
+        delete(AnimeTag).where(AnimeTag.anime_id.in_(list(tags_by_anime_id)))
+    )
+
+    rows = [
+        {"anime_id": anime_id, "tag": tag}
+        for anime_id, tags in tags_by_anime_id.items()
+        for tag in dict.fromkeys(normalize_tag(tag) for tag in tags or [])
+        if tag
+    ]
+
+    if rows:
+        _ = connection.execute(insert(AnimeTag), rows)
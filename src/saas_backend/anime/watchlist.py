@@ -0,0 +1,66 @@
+# STL
+from typing import Any
+from collections.abc import Sequence
+
+# PDM
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import sqlite, postgresql
+
+# LOCAL
+from saas_backend.auth.models import Watchlist, WatchlistToAnime
+
+
+async def get_or_create_watchlist(connection: AsyncSession, user_id: int) -> Watchlist:
+    watchlist = await connection.scalar(
+        select(Watchlist).where(Watchlist.user_id == user_id)
+    )
+
+    if not watchlist:
+        watchlist = Watchlist(user_id=user_id)
+        connection.add(watchlist)
+        await connection.flush()  # Flush to ensure the new watchlist has an ID
+
+    return watchlist
+
+
+async def upsert_watchlist_entries(
+    connection: AsyncSession,
+    entries: Sequence[dict[str, Any]],
+    update_columns: Sequence[str],
+) -> None:
+    """
+    Insert watchlist entries, or update `update_columns` of the entries that already
+    exist, in one statement keyed on the unique (watchlist_id, anime_id) index.
+    Repeated entries are collapsed first, the last one wins, since an upsert can't
+    touch the same row twice.
+    """
+    entries = list(
+        {
+            (entry["watchlist_id"], entry["anime_id"]): entry for entry in entries
+        }.values()
+    )
+
+    if not entries:
+        return
+
+    dialect = connection.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        statement = postgresql.insert(WatchlistToAnime)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(WatchlistToAnime)
+    else:
+        raise NotImplementedError(f"Watchlist upserts are not supported on {dialect}")
+
+    index_elements = [WatchlistToAnime.watchlist_id, WatchlistToAnime.anime_id]
+
+    if update_columns:
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in update_columns},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+
+    _ = await connection.execute(statement, entries)
@@ -0,0 +1,175 @@
+# STL
+from typing import Any
+from collections.abc import Iterable, Sequence, AsyncGenerator
+from contextlib import asynccontextmanager
+
+# PDM
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# LOCAL
+from saas_backend.auth.models import (
+    Anime,
+    Watchlist,
+    CatalogState,
+    WatchlistStats,
+    WatchlistToAnime,
+)
+from saas_backend.auth.database import use_writer
+from saas_backend.anime.catalog import get_catalog_version
+
+# (status, rating, episode_count, tags) of a watchlist entry whose anime exists
+EntryRow = tuple[Any, int | None, int | None, list[str] | None]
+
+
+def _bump(counts: dict[str, int], key: str, sign: int):
+    counts[key] = counts.get(key, 0) + sign
+
+    if not counts[key]:
+        del counts[key]
+
+
+def apply_entries(stats: WatchlistStats, rows: Iterable[EntryRow], sign: int):
+    """Add (sign=1) or remove (sign=-1) the contribution of entries to `stats`."""
+    tag_counts = dict(stats.tag_counts or {})
+    status_counts = dict(stats.status_counts or {})
+    rating_counts = dict(stats.rating_counts or {})
+
+    for status, rating, episode_count, tags in rows:
+        stats.anime_count += sign
+        stats.total_episodes += sign * (episode_count or 0)
+
+        for tag in tags or []:
+            _bump(tag_counts, tag, sign)
+
+        if status is not None:
+            _bump(status_counts, status.value, sign)
+
+        if rating is not None:
+            _bump(rating_counts, str(rating), sign)
+
+    # JSON columns only register a change when reassigned
+    stats.tag_counts = tag_counts
+    stats.status_counts = status_counts
+    stats.rating_counts = rating_counts
+
+
+async def get_entry_rows(
+    connection: AsyncSession,
+    watchlist_id: int,
+    anime_ids: Sequence[int] | None = None,
+) -> list[EntryRow]:
+    """Rows of the watchlist's entries, or only of `anime_ids` when given."""
+    query = (
+        select(
+            WatchlistToAnime.status,
+            WatchlistToAnime.rating,
+            Anime.episode_count,
+            Anime.tags,
+        )
+        .join(Anime, Anime.id == WatchlistToAnime.anime_id)
+        .where(WatchlistToAnime.watchlist_id == watchlist_id)
+    )
+
+    if anime_ids is not None:
+        query = query.where(WatchlistToAnime.anime_id.in_(anime_ids))
+
+    return [tuple(row) for row in await connection.execute(query)]
+
+
+async def rebuild_watchlist_stats(
+    connection: AsyncSession, stats: WatchlistStats, catalog_version: int
+):
+    stats.anime_count = 0
+    stats.total_episodes = 0
+    stats.tag_counts = {}
+    stats.status_counts = {}
+    stats.rating_counts = {}
+    stats.catalog_version = catalog_version
+
+    apply_entries(stats, await get_entry_rows(connection, stats.watchlist_id), 1)
+
+
+async def get_watchlist_stats(
+    connection: AsyncSession, watchlist_id: int
+) -> WatchlistStats:
+    """
+    The watchlist's stats row, locked for the rest of the transaction. It is built
+    from the entries when missing, or rebuilt when the catalog changed since.
+
+    The transaction moves to the write engine first, which on SQLite holds the
+    database's write lock from the start (see begin_immediate); elsewhere the
+    watchlist row is locked, as the stats row may not exist yet.
+    """
+    use_writer(connection)
+
+    _ = await connection.execute(
+        select(Watchlist.id).where(Watchlist.id == watchlist_id).with_for_update()
+    )
+    stats = await connection.scalar(
+        select(WatchlistStats)
+        .where(WatchlistStats.watchlist_id == watchlist_id)
+        .execution_options(populate_existing=True)
+    )
+    catalog_version = await connection.run_sync(get_catalog_version)
+
+    if stats is None:
+        stats = WatchlistStats(watchlist_id=watchlist_id)
+        connection.add(stats)
+        await rebuild_watchlist_stats(connection, stats, catalog_version)
+    elif stats.catalog_version != catalog_version:
+        await rebuild_watchlist_stats(connection, stats, catalog_version)
+
+    return stats
+
+
+@asynccontextmanager
+async def track_watchlist_stats(
+    connection: AsyncSession, watchlist_id: int, anime_ids: Sequence[int]
+) -> AsyncGenerator[None, None]:
+    """
+    Keep the watchlist's stats in step with writes to the entries of `anime_ids`
+    made inside the block: their old contribution is removed and the new one
+    added. The caller commits.
+    """
+    stats = await get_watchlist_stats(connection, watchlist_id)
+    before = await get_entry_rows(connection, watchlist_id, anime_ids)
+
+    yield
+
+    after = await get_entry_rows(connection, watchlist_id, anime_ids)
+
+    apply_entries(stats, before, -1)
+    apply_entries(stats, after, 1)
+
+
+async def read_watchlist_stats(
+    connection: AsyncSession, user_id: int
+) -> WatchlistStats | None:
+    """
+    The stats of the user's watchlist, read in a single query unless they still have
+    to be built. None when the user has no watchlist.
+    """
+    catalog_version = (
+        select(CatalogState.version).where(CatalogState.id == 1).scalar_subquery()
+    )
+
+    row = (
+        await connection.execute(
+            select(Watchlist.id, WatchlistStats, catalog_version)
+            .outerjoin(WatchlistStats, WatchlistStats.watchlist_id == Watchlist.id)
+            .where(Watchlist.user_id == user_id)
+            .limit(1)
+        )
+    ).first()
+
+    if row is None:
+        return None
+
+    watchlist_id, stats, version = row
+
+    if stats is None or stats.catalog_version != (version or 0):
+        stats = await get_watchlist_stats(connection, watchlist_id)
+        await connection.commit()
+
+    return stats
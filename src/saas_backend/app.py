@@ -1,15 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from saas_backend.auth.router import router as auth_router
 from dotenv import load_dotenv
 
 from saas_backend.anime import anime_router
+from saas_backend.anime.compute import compute
+from saas_backend.auth.database import async_write_engine, pool_status
+from saas_backend.auth.jwt_handler.revocations import (
+    blacklist_purger,
+    revocation_sweeper,
+)
 from saas_backend.startup import on_startup
 from saas_backend.integrations import integrations_router
+from saas_backend.integrations.router import lookup_cache
+from saas_backend.integrations.upstream import upstream
 
 _ = load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    compute.start()
+
+    tasks = [
+        asyncio.create_task(revocation_sweeper()),
+        asyncio.create_task(blacklist_purger()),
+    ]
+
+    yield
+
+    for task in tasks:
+        _ = task.cancel()
+
+    _ = await asyncio.gather(*tasks, return_exceptions=True)
+    await upstream.aclose()
+    compute.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(anime_router)
@@ -28,4 +59,10 @@ on_startup()
 
 @app.get("/health")
 def health_check():
-    return {"message": "OK"}
+    return {
+        "message": "OK",
+        "database_pool": pool_status(),
+        "database_write_pool": pool_status(async_write_engine.sync_engine),
+        "lookup_cache": lookup_cache.stats(),
+        "compute": compute.stats(),
+    }
@@ -1,8 +1,16 @@
 import os
-from collections.abc import Generator
+from typing import Any
+from collections.abc import Generator, AsyncGenerator
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, Connection, event, make_url, create_engine
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -11,16 +19,188 @@ _ = load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/database.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_recycle=1800,
+# Drivers used by the async engine for each backend of DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+ENGINE_OPTIONS: dict[str, Any] = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+}
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# Applied to every new SQLite connection: WAL lets readers run alongside the writer,
+# busy_timeout makes writers from other processes wait instead of failing, and
+# foreign_keys enforces the FKs and their ON DELETE CASCADE, off by default in SQLite
+SQLITE_PRAGMAS = {
+    "foreign_keys": "ON",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),  # in KiB if < 0
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),  # in ms
+}
+
+
+def apply_sqlite_pragmas(engine: Engine):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _: Any):
+        cursor = dbapi_connection.cursor()
+
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+
+        cursor.close()
+
+
+def begin_immediate(engine: Engine):
+    """
+    Start every transaction on the SQLite `engine` with BEGIN IMMEDIATE, so it holds
+    the database's write lock from its first statement, reads included, and
+    read-modify-write transactions can't interleave across processes.
+    """
+
+    @event.listens_for(engine, "connect")
+    def disable_driver_begin(dbapi_connection: Any, _: Any):
+        # The driver would otherwise open its own deferred transaction on writes
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection: Connection):
+        _ = connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# Sync engine for startup, the scripts and Alembic
+engine = create_engine(DATABASE_URL, **ENGINE_OPTIONS)
+# Async engines for the request handlers. SQLite allows a single writer at a time,
+# so writes get their own one-connection pool and queue there, taking the write lock
+# as they begin, while reads keep the full pool; other databases use one engine
+# for both.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **ENGINE_OPTIONS)
+async_write_engine = (
+    create_async_engine(
+        ASYNC_DATABASE_URL, **{**ENGINE_OPTIONS, "pool_size": 1, "max_overflow": 0}
+    )
+    if IS_SQLITE
+    else async_engine
 )
 
+if IS_SQLITE:
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    apply_sqlite_pragmas(async_write_engine.sync_engine)
+    begin_immediate(async_write_engine.sync_engine)
+
+# Key in Session.info marking a transaction that has written
+WRITING = "writing"
+
+
+class RoutingSession(Session):
+    """
+    Sends flushes and INSERT/UPDATE/DELETE statements to the write engine and
+    everything else to the read engine. Once a transaction has written it stays on
+    the write engine, so it reads its own uncommitted changes.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        read_engine: AsyncEngine = async_engine,
+        write_engine: AsyncEngine = async_write_engine,
+        **kw: Any,
+    ):
+        super().__init__(*args, **kw)
+        self.read_engine = read_engine.sync_engine
+        self.write_engine = write_engine.sync_engine
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any):
+        # Session has no public "flush in progress" flag; `_flushing` is set by
+        # Session.flush around the unit of work (pinned by the tests in
+        # tests/auth/test_database.py)
+        if (
+            self.info.get(WRITING)
+            or self._flushing  # pyright: ignore[reportPrivateUsage]
+            or isinstance(clause, UpdateBase)
+        ):
+            self.info[WRITING] = True
+            return self.write_engine
+
+        return self.read_engine
+
+
+def use_writer(session: AsyncSession):
+    """Run the rest of the session's transaction on the write engine, for
+    read-modify-write sequences that must not interleave with other writers."""
+    session.sync_session.info[WRITING] = True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session: Session, transaction: Any):
+    if transaction.parent is None:
+        _ = session.info.pop(WRITING, None)
+
+
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Rows stay usable after commit, an expired attribute can't lazy-load in async code
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
+# Lifetime counters of pool events per engine, see pool_status
+pool_events: dict[Engine, dict[str, int]] = {}
+
+
+def track_pool(engine: Engine):
+    counters = pool_events.setdefault(
+        engine, {"connects": 0, "checkouts": 0, "checkins": 0}
+    )
+
+    def counter(key: str):
+        def listener(*_: Any):
+            counters[key] += 1
+
+        return listener
+
+    for name in ["connect", "checkout", "checkin"]:
+        event.listen(engine, name, counter(f"{name}s"))
+
+
+track_pool(engine)
+track_pool(async_engine.sync_engine)
+
+if async_write_engine is not async_engine:
+    track_pool(async_write_engine.sync_engine)
+
+
+def pool_status(engine: Engine = async_engine.sync_engine) -> dict[str, int]:
+    """Current pool usage; `checked_out` should drop back to 0 between requests."""
+    pool = engine.pool
+
+    return {
+        "size": pool.size(),  # pyright: ignore[reportAttributeAccessIssue]
+        "checked_in": pool.checkedin(),  # pyright: ignore[reportAttributeAccessIssue]
+        "checked_out": pool.checkedout(),  # pyright: ignore[reportAttributeAccessIssue]
+        "overflow": pool.overflow(),  # pyright: ignore[reportAttributeAccessIssue]
+        **pool_events.get(engine, {}),
+    }
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -29,3 +209,15 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Request-scoped session dependency. FastAPI caches it per request, so the route
+    and the auth dependencies share one session, which is closed (returning its
+    connection to the pool) once the response has been sent.
+
+    Code running outside a request should use `with SessionLocal() as db:` instead.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
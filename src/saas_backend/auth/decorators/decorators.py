@@ -2,8 +2,10 @@ from typing import Any, Callable, TypeVar, cast
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from functools import wraps
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from saas_backend.auth.models import User
+from saas_backend.auth.database import AsyncSessionLocal
 from saas_backend.logger import LOG
 from saas_backend.auth.user_manager.user_manager import UserManager
 
@@ -14,7 +16,8 @@ def requires_credit(decrement: bool = True) -> Callable[[F], F]:
     """
     Decorator factory that requires a user to have credits to use the function.
 
-    If decrement is True, the user's credits will be decremented.
+    If decrement is True, the user's credits will be decremented, using the
+    request's `db` session when the route takes one.
     Attaches the user's credits to the response.
     """
 
@@ -36,7 +39,14 @@ def requires_credit(decrement: bool = True) -> Callable[[F], F]:
             result = await func(*args, **kwargs)
 
             if decrement:
-                UserManager.decrement_user_credits(user.id)
+                db = kwargs.get("db")
+
+                if isinstance(db, AsyncSession):
+                    await UserManager.decrement_user_credits(db, user.id)
+                else:
+                    async with AsyncSessionLocal() as db:
+                        await UserManager.decrement_user_credits(db, user.id)
+
                 result["credits"] = user.credits - 1
             else:
                 result["credits"] = user.credits
@@ -1,12 +1,14 @@
 from datetime import timedelta
 from typing import Any
-from datetime import datetime
+from datetime import datetime, timezone
 import jwt
 
 from saas_backend.auth.constants import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, get_secret
-from saas_backend.auth.database import get_db
 from saas_backend.auth.models import Blacklist
+from saas_backend.auth.jwt_handler.revocations import revocations
 from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from saas_backend.logger import LOG
 
 
@@ -49,47 +51,29 @@ class JwtHandler:
         to_encode.update({"exp": expire})
         encoded_jwt = jwt.encode(to_encode, get_secret(), algorithm=ALGORITHM)
 
-        JwtHandler.blacklist_token(encoded_jwt, expires_at=expire)
-
         return encoded_jwt
 
     @staticmethod
-    def expire_token(jti: str):
-        db = next(get_db())
-        _ = (
-            db.query(Blacklist)
-            .filter(Blacklist.jti == jti)
-            .update({"expires_at": datetime.now()})
+    async def revoke_token(db: AsyncSession, jti: str):
+        """Blacklist a token until it expires, in the database and in memory."""
+        decoded = JwtHandler.decode(jti)
+        # `exp` was encoded from a naive datetime, which PyJWT treats as UTC
+        expires_at = datetime.fromtimestamp(decoded["exp"], timezone.utc).replace(
+            tzinfo=None
         )
 
-        db.commit()
-
-    @staticmethod
-    def blacklist_token(jti: str, expires_at: datetime):
-        db = next(get_db())
-        _ = (
-            db.query(Blacklist)
-            .filter(Blacklist.jti == jti)
-            .update({"expires_at": expires_at})
-        )
+        if revocations.is_revoked(jti):
+            return
 
-        db.commit()
+        if not await db.scalar(select(Blacklist.id).where(Blacklist.jti == jti)):
+            db.add(Blacklist(jti=jti, expires_at=expires_at))
+            await db.commit()
 
-    @staticmethod
-    def remove_token(jti: str):
-        db = next(get_db())
-        _ = db.query(Blacklist).filter(Blacklist.jti == jti).delete()
-        db.commit()
+        revocations.revoke(jti, expires_at)
 
     @staticmethod
     def is_expired(jti: str):
-        db = next(get_db())
-        blacklist = db.query(Blacklist).filter(Blacklist.jti == jti).first()
-
-        if blacklist is None:
-            return False
-
-        if blacklist.expires_at < datetime.now():
+        if not revocations.is_revoked(jti):
             return False
 
         raise HTTPException(
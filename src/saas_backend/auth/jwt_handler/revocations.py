@@ -0,0 +1,143 @@
+# STL
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime
+from collections.abc import Iterable
+
+# PDM
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.auth.models import Blacklist
+from saas_backend.auth.database import AsyncSessionLocal
+
+# Seconds between reloads of the blacklist table, which pick up tokens revoked by
+# other workers and drop the ones that have expired anyway
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 60))
+# Seconds between purges of expired blacklist rows, and rows deleted per statement
+BLACKLIST_PURGE_INTERVAL = float(os.getenv("BLACKLIST_PURGE_INTERVAL", 3600))
+BLACKLIST_PURGE_BATCH_SIZE = int(os.getenv("BLACKLIST_PURGE_BATCH_SIZE", 1000))
+
+
+class RevocationList:
+    """
+    In-memory copy of the unexpired rows of the blacklist table: revoked token ->
+    the time the token expires anyway. Checking a token costs no I/O.
+    """
+
+    def __init__(self):
+        self._revoked: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > datetime.now()
+
+    def revoke(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def load(self, rows: Iterable[tuple[str, datetime]]):
+        """Merge (jti, expires_at) rows from the database. Revocations are never undone,
+        so entries missing from `rows` are kept until they expire."""
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+
+        _ = self.prune()
+
+    def prune(self) -> int:
+        now = datetime.now()
+
+        with self._lock:
+            expired = [
+                jti for jti, expires_at in self._revoked.items() if expires_at <= now
+            ]
+
+            for jti in expired:
+                del self._revoked[jti]
+
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+
+
+revocations = RevocationList()
+
+
+def unexpired_revocations():
+    return select(Blacklist.jti, Blacklist.expires_at).where(
+        Blacklist.expires_at > datetime.now()
+    )
+
+
+async def sync_revocations():
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(unexpired_revocations())
+        revocations.load(rows)
+
+
+async def revocation_sweeper(interval: float = REVOCATION_SYNC_INTERVAL):
+    """Reload the revocation list every `interval` seconds, run in the app lifespan."""
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            await sync_revocations()
+        except Exception as e:
+            LOG.error(f"Error syncing token revocations: {e}")
+
+
+async def purge_expired_blacklist(
+    db: AsyncSession, batch_size: int = BLACKLIST_PURGE_BATCH_SIZE
+) -> int:
+    """
+    Delete the blacklist rows of tokens that have expired anyway, `batch_size` rows
+    per transaction (found through the expires_at index) so the write lock is
+    never held for long. Returns the number of rows deleted.
+    """
+    start = time.perf_counter()
+    purged = 0
+
+    while True:
+        expired = (
+            select(Blacklist.id)
+            .where(Blacklist.expires_at <= datetime.now())
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(Blacklist).where(Blacklist.id.in_(expired.scalar_subquery()))
+        )
+        await db.commit()
+
+        purged += result.rowcount
+
+        if result.rowcount < batch_size:
+            break
+
+    LOG.info(
+        f"Purged {purged} expired blacklist rows in {time.perf_counter() - start:.2f}s"
+    )
+
+    return purged
+
+
+async def blacklist_purger(interval: float = BLACKLIST_PURGE_INTERVAL):
+    """Purge expired blacklist rows now and every `interval` seconds, run in the app lifespan."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                _ = await purge_expired_blacklist(db)
+        except Exception as e:
+            LOG.error(f"Error purging expired blacklist rows: {e}")
+
+        await asyncio.sleep(interval)
@@ -2,7 +2,19 @@ from enum import Enum as StdEnum
 from typing import final
 
 from pydantic import BaseModel
-from sqlalchemy import JSON, Column, DateTime, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    false,
+)
 
 from saas_backend.auth.database import Base
 
@@ -62,14 +74,44 @@ class Anime(Base):
     sources = Column(JSON)
     reccomendation_string = Column(String)
     extra_titles = Column(JSON)
+    removed = Column(
+        Boolean, default=False, server_default=false(), nullable=False
+    )  # dropped from the offline database, kept for existing watchlists
+
+
+@final
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)  # single row
+    version = Column(Integer, nullable=False)  # bumped on every catalog change
+    updated_at = Column(DateTime)
+
+
+@final
+class AnimeTag(Base):
+    __tablename__ = "anime_tag"
+    anime_id = Column(
+        Integer, ForeignKey("anime.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag = Column(String, primary_key=True, index=True)  # normalized, see normalize_tag
 
 
 @final
 class WatchlistToAnime(Base):
     __tablename__ = "watchlist_to_anime"
+    __table_args__ = (
+        Index(
+            "ix_watchlist_to_anime_watchlist_id_anime_id",
+            "watchlist_id",
+            "anime_id",
+            unique=True,
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)  # entry id
-    watchlist_id = Column(Integer)  # watchlist id
-    anime_id = Column(Integer)  # anime id
+    watchlist_id = Column(
+        Integer, ForeignKey("watchlist.id", ondelete="CASCADE")
+    )  # watchlist id
+    anime_id = Column(Integer)  # anime id, no FK as anime rows are never deleted
     status = Column(Enum(AnimeStatus))  # status of the anime
     rating = Column(Integer)  # rating of the anime
 
@@ -78,4 +120,18 @@ class WatchlistToAnime(Base):
 class Watchlist(Base):
     __tablename__ = "watchlist"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer)
+    user_id = Column(Integer, ForeignKey("user.id"), index=True)
+
+
+@final
+class WatchlistStats(Base):
+    __tablename__ = "watchlist_stats"
+    watchlist_id = Column(
+        Integer, ForeignKey("watchlist.id", ondelete="CASCADE"), primary_key=True
+    )
+    catalog_version = Column(Integer)  # catalog the episode and tag counts come from
+    anime_count = Column(Integer, nullable=False, default=0)
+    total_episodes = Column(Integer, nullable=False, default=0)
+    tag_counts = Column(JSON, nullable=False, default=dict)  # tag -> entries
+    status_counts = Column(JSON, nullable=False, default=dict)  # status -> entries
+    rating_counts = Column(JSON, nullable=False, default=dict)  # "rating" -> entries
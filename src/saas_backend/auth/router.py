@@ -8,14 +8,15 @@ from datetime import timedelta
 import jwt
 import sqlalchemy
 from fastapi import Header, Depends, APIRouter, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
 
 # LOCAL
 from saas_backend.logger import LOG
 from saas_backend.auth.models import User, APIKey, BaseUser, Watchlist
-from saas_backend.auth.database import get_db
+from saas_backend.auth.database import get_async_db
 from saas_backend.auth.constants import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     HEADER_AUTH_ENABLED,
@@ -32,7 +33,7 @@ router = APIRouter()
 async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Unified login endpoint.
 
@@ -46,17 +47,19 @@ async def login(
         if not username:
             raise HTTPException(status_code=401, detail="Missing header-auth username")
 
-        user = db.query(User).filter(User.username == username).first()
+        user = await db.scalar(select(User).where(User.username == username))
         if not user:
             user = User(username=username, email=email, hashed_password="")
             db.add(user)
-            db.flush()
+            await db.flush()
             new_watchlist = Watchlist(user_id=user.id)
             db.add(new_watchlist)
-            db.commit()
+            await db.commit()
     else:
         # Standard password login
-        user = UserManager.authenticate_user(form_data.username, form_data.password)
+        user = await UserManager.authenticate_user(
+            db, form_data.username, form_data.password
+        )
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = JwtHandler.create_access_token(
@@ -87,13 +90,16 @@ async def login(
 
 
 @router.post("/logout")
-async def logout_user(token: str = Header(..., alias="Authorization")):
+async def logout_user(
+    token: str = Header(..., alias="Authorization"),
+    db: AsyncSession = Depends(get_async_db),
+):
     try:
         try:
-            user = UserManager.get_user_from_access_token(token)
+            user = await UserManager.get_user_from_access_token(db, token)
 
-        except HTTPException:
-            JwtHandler.remove_token(token)  # already expired
+        except HTTPException:  # already expired or revoked
+            UserManager.forget_access_token(token)
             return {"message": "User logged out successfully"}
 
         if not user:
@@ -103,7 +109,8 @@ async def logout_user(token: str = Header(..., alias="Authorization")):
         print(f"Error: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    JwtHandler.expire_token(token)
+    await JwtHandler.revoke_token(db, token.split(" ")[1] if " " in token else token)
+    UserManager.forget_access_token(token)
 
     return {"message": "User logged out successfully"}
 
@@ -115,7 +122,7 @@ async def header_login():
 
 
 @router.post("/register")
-async def register_user(user: BaseUser, db: Session = Depends(get_db)):
+async def register_user(user: BaseUser, db: AsyncSession = Depends(get_async_db)):
     if HEADER_AUTH_ENABLED:
         raise HTTPException(
             status_code=403,
@@ -134,7 +141,7 @@ async def register_user(user: BaseUser, db: Session = Depends(get_db)):
 
         db.add(new_user)
         db.add(new_watchlist)
-        db.commit()
+        await db.commit()
     except sqlalchemy.exc.IntegrityError:
         raise HTTPException(
             status_code=400, detail=str("User with this username already exists")
@@ -145,14 +152,15 @@ async def register_user(user: BaseUser, db: Session = Depends(get_db)):
 
 @router.put("/api-key")
 async def create_api_key(
-    token: str = Header(..., alias="Authorization"), db: Session = Depends(get_db)
+    token: str = Header(..., alias="Authorization"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     api_key = uuid.uuid4().hex
-    user = UserManager.get_user_from_access_token(token)
+    user = await UserManager.get_user_from_access_token(db, token)
 
     new_api_key = APIKey(user_id=user.id, api_key=api_key)
     db.add(new_api_key)
-    db.commit()
+    await db.commit()
 
     return {"message": "API key created successfully", "api_key": api_key}
 
@@ -160,9 +168,9 @@ async def create_api_key(
 @router.get("/api-key")
 async def get_api_key(
     user: User = Depends(UserManager.get_user_from_header),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    api_key = db.query(APIKey).filter(APIKey.user_id == user.id).first()
+    api_key = await db.scalar(select(APIKey).where(APIKey.user_id == user.id))
 
     if api_key is None:
         raise HTTPException(status_code=404, detail="API key not found")
@@ -173,16 +181,17 @@ async def get_api_key(
 @router.delete("/api-key")
 async def delete_api_key(
     user: User = Depends(UserManager.get_user_from_header),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        api_key = db.query(APIKey).filter(APIKey.user_id == user.id).first()
+        api_key = await db.scalar(select(APIKey).where(APIKey.user_id == user.id))
 
         if api_key is None:
             raise HTTPException(status_code=404, detail="API key not found")
 
-        _ = db.query(APIKey).filter(APIKey.user_id == user.id).delete()
-        db.commit()
+        _ = await db.execute(delete(APIKey).where(APIKey.user_id == user.id))
+        await db.commit()
+        UserManager.forget_user(user.id)
         return {"message": "API key deleted successfully"}
     except Exception as e:
         LOG.error(f"Error deleting API key: {e}")
@@ -1,8 +1,25 @@
+import os
+import time
 import hashlib
+from typing import Any
+from saas_backend.cache import TTLCache
+from saas_backend.utils import to_dict
 from saas_backend.auth.jwt_handler import JwtHandler
-from saas_backend.auth.database import get_db
+from saas_backend.auth.database import get_async_db
 from saas_backend.auth.models import APIKey, User
-from fastapi import HTTPException, Header
+from fastapi import Depends, HTTPException, Header
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+
+# ("token" | "api_key", credential) -> the user's column values. Entries for a token
+# never outlive the token itself; logout, API-key deletion and credit changes
+# drop them explicitly.
+user_cache: TTLCache[tuple[str, str], dict[str, Any]] = TTLCache(
+    USER_CACHE_SIZE, USER_CACHE_TTL
+)
 
 
 class UserManager:
@@ -13,46 +30,42 @@ class UserManager:
     async def get_user_from_header(
         token: str | None = Header(None, alias="Authorization"),
         api_key: str | None = Header(None, alias="X-API-Key"),
+        db: AsyncSession = Depends(get_async_db),
     ) -> User:
         if not token and not api_key:
             raise HTTPException(status_code=401, detail="Missing token or API key")
 
-        return UserManager.get_user(token, api_key)
+        return await UserManager.get_user(db, token, api_key)
 
     @staticmethod
-    def get_user(access_token: str | None, api_key: str | None) -> User:
+    async def get_user(
+        db: AsyncSession, access_token: str | None, api_key: str | None
+    ) -> User:
         if access_token:
-            return UserManager.get_user_from_access_token(access_token)
+            return await UserManager.get_user_from_access_token(db, access_token)
         elif api_key:
-            return UserManager.get_user_from_api_key(api_key)
+            return await UserManager.get_user_from_api_key(db, api_key)
         else:
             raise HTTPException(status_code=401, detail="Missing token or API key")
 
     @staticmethod
-    def get_user_credits(user_id: int) -> int | None:
-        db = next(get_db())
-        user = db.query(User).filter(User.id == user_id).first()
-
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
+    async def get_user_credits(db: AsyncSession, user_id: int) -> int | None:
+        user = await UserManager.get_user_from_db(db, user_id)
 
         return user.credits
 
     @staticmethod
-    def decrement_user_credits(user_id: int):
-        db = next(get_db())
-        user = db.query(User).filter(User.id == user_id).first()
-
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
+    async def decrement_user_credits(db: AsyncSession, user_id: int):
+        user = await UserManager.get_user_from_db(db, user_id)
 
         user.credits -= 1  # pyright: ignore[reportAttributeAccessIssue]
-        db.commit()
+        await db.commit()
+
+        UserManager.forget_user(user_id)
 
     @staticmethod
-    def get_user_from_db(user_id: int) -> User:
-        db = next(get_db())
-        user = db.query(User).filter(User.id == user_id).first()
+    async def get_user_from_db(db: AsyncSession, user_id: int) -> User:
+        user = await db.scalar(select(User).where(User.id == user_id))
 
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
@@ -60,30 +73,70 @@ class UserManager:
         return user
 
     @staticmethod
-    def get_user_from_access_token(access_token: str) -> User:
+    async def get_user_from_access_token(db: AsyncSession, access_token: str) -> User:
         access_token = (
             access_token.split(" ")[1] if " " in access_token else access_token
         )
 
+        # Checked before the cache, so a token revoked by any worker stops working
+        # as soon as the revocation reaches this one
         _ = JwtHandler.is_expired(access_token)
+        cached = user_cache.get(("token", access_token))
+
+        if cached is not None:
+            return User(**cached)
+
         decoded = JwtHandler.decode(access_token)
+        user = await UserManager.get_user_from_db(db, decoded["id"])
 
-        return UserManager.get_user_from_db(decoded["id"])
+        user_cache.set(
+            ("token", access_token),
+            UserManager.cache_entry(user),
+            ttl=decoded["exp"] - time.time(),
+        )
+
+        return user
 
     @staticmethod
-    def get_user_from_api_key(api_key: str) -> User:
-        db = next(get_db())
-        api_key = db.query(APIKey).filter(APIKey.api_key == api_key).first()
+    async def get_user_from_api_key(db: AsyncSession, api_key: str) -> User:
+        cached = user_cache.get(("api_key", api_key))
 
-        if api_key is None:
+        if cached is not None:
+            return User(**cached)
+
+        key = await db.scalar(select(APIKey).where(APIKey.api_key == api_key))
+
+        if key is None:
             raise HTTPException(status_code=401, detail="Invalid API key")
 
-        return UserManager.get_user_from_db(api_key.user_id)
+        user = await UserManager.get_user_from_db(db, key.user_id)
+        user_cache.set(("api_key", api_key), UserManager.cache_entry(user))
+
+        return user
+
+    @staticmethod
+    def cache_entry(user: User) -> dict[str, Any]:
+        """The user's columns, minus the password hash, which never needs to be cached."""
+        entry = to_dict(user)
+        del entry["hashed_password"]
+
+        return entry
+
+    @staticmethod
+    def forget_access_token(access_token: str):
+        access_token = (
+            access_token.split(" ")[1] if " " in access_token else access_token
+        )
+        _ = user_cache.pop(("token", access_token))
+
+    @staticmethod
+    def forget_user(user_id: int):
+        """Drop every cached credential of a user whose row changed."""
+        _ = user_cache.discard_where(lambda user: user["id"] == user_id)
 
     @staticmethod
-    def authenticate_user(username: str, password: str) -> User:
-        db = next(get_db())
-        user = db.query(User).filter(User.username == username).first()
+    async def authenticate_user(db: AsyncSession, username: str, password: str) -> User:
+        user = await db.scalar(select(User).where(User.username == username))
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
 
         if user is None or not (user.hashed_password == hashed_password):
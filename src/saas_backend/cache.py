@@ -0,0 +1,133 @@
+# STL
+import time
+import asyncio
+import threading
+from typing import Generic, TypeVar
+from collections import OrderedDict
+from collections.abc import Callable, Awaitable
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe mapping holding at most `maxsize` entries, evicting the least
+    recently used one when full. Entries expire `ttl` seconds after being set.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store `value`, for at most `ttl` seconds when given (capped at self.ttl)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                _ = self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+        return entry[1] if entry else None
+
+    def discard_where(self, predicate: Callable[[V], bool]) -> int:
+        """Drop every entry whose value matches `predicate`, returns how many."""
+        with self._lock:
+            keys = [
+                key for key, (_, value) in self._entries.items() if predicate(value)
+            ]
+
+            for key in keys:
+                del self._entries[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class AsyncLoadingCache(Generic[K, V]):
+    """
+    TTLCache in front of an async loader. Concurrent misses on one key share a
+    single load (single flight), which runs as its own task so a caller being
+    cancelled doesn't cancel it for the others. Failed loads are not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache[K, V] = TTLCache(maxsize, ttl)
+        self._pending: dict[K, asyncio.Task[V]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that waited on a load already in flight
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        value = self._cache.get(key)
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._pending.get(key)
+
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(load())
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: K, task: "asyncio.Task[V]"):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+
+        if not task.cancelled() and task.exception() is None:
+            self._cache.set(key, task.result())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+    def clear(self) -> None:
+        self._cache.clear()
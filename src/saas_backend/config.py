@@ -0,0 +1,116 @@
+# STL
+import os
+import threading
+from types import MappingProxyType
+from typing import Any
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+# PDM
+import yaml
+
+CONFIG_PATH = os.getenv("CONFIG_PATH", "config.yaml")
+
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of parsed YAML: mappings become MappingProxyType, lists tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+@dataclass(frozen=True)
+class IntegrationConfig:
+    url: str
+    api_key: str
+
+
+@dataclass(frozen=True)
+class Config:
+    """Immutable snapshot of config.yaml."""
+
+    sections: Mapping[str, Any]
+    mtime_ns: int = 0
+
+    def section(self, name: str) -> Any | None:
+        return self.sections.get(name)
+
+    def integration(self, name: str) -> IntegrationConfig | None:
+        """The url and api_key of a Sonarr/Radarr-style section, None if not set up."""
+        section = self.section(name)
+
+        if not section or not section.get("url"):
+            return None
+
+        return IntegrationConfig(
+            url=str(section["url"]).rstrip("/"), api_key=str(section.get("api_key", ""))
+        )
+
+    @property
+    def sonarr(self) -> IntegrationConfig | None:
+        return self.integration("sonarr")
+
+    @property
+    def radarr(self) -> IntegrationConfig | None:
+        return self.integration("radarr")
+
+    @property
+    def jellyfin(self) -> Mapping[str, Any] | None:
+        return self.section("jellyfin")
+
+
+class ConfigLoader:
+    """
+    Parses the config file once and serves the snapshot until the file's mtime or
+    size changes, or `reload` is called. Checking costs a stat per call.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        # ((mtime_ns, size) of the file when parsed, snapshot), swapped as a whole
+        self._loaded: tuple[tuple[int, int], Config] | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Config:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{self.path} not found")
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        loaded = self._loaded
+
+        if loaded is not None and loaded[0] == stamp:
+            return loaded[1]
+
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != stamp:
+                self._loaded = (stamp, self._load(stat.st_mtime_ns))
+
+            return self._loaded[1]
+
+    def reload(self) -> Config:
+        with self._lock:
+            self._loaded = None
+
+        return self.get()
+
+    def _load(self, mtime_ns: int) -> Config:
+        try:
+            with open(self.path, "r") as f:
+                sections = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{self.path} not found")
+
+        return Config(sections=freeze(sections), mtime_ns=mtime_ns)
+
+
+config_loader = ConfigLoader()
+
+
+def get_config() -> Config:
+    return config_loader.get()
@@ -1,17 +1,28 @@
 # STL
 import xml.etree.ElementTree as ET
-from typing import BinaryIO
+from typing import Any, BinaryIO
 from logging import getLogger
+from itertools import islice
+from collections.abc import Iterator
+from dataclasses import field, asdict, dataclass
 
 # PDM
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # LOCAL
-from saas_backend.auth.models import Anime, Watchlist, WatchlistToAnime
-from saas_backend.auth.database import get_db
+from saas_backend.anime.watchlist import (
+    get_or_create_watchlist,
+    upsert_watchlist_entries,
+)
+from saas_backend.anime.catalog import get_catalog_version
+from saas_backend.anime.compute import compute, match_titles
+from saas_backend.anime.watchlist_stats import track_watchlist_stats
 
 logger = getLogger(__name__)
 
+# Titles sent to a compute worker per call
+MATCH_BATCH_SIZE = 1000
+
 
 def convert_from_mal_status(status: str) -> str:
     if status == "Completed":
@@ -24,67 +35,90 @@ def convert_from_mal_status(status: str) -> str:
         return "WATCHING"
 
 
-def xml_to_watchlist(xml_file: BinaryIO, user_id: int):
-    # Parse the XML file
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+@dataclass
+class MatchReport:
+    total: int = 0
+    matched_by_title: int = 0
+    matched_by_synonym: int = 0
+    duplicates: int = 0  # entries resolving to an anime matched earlier in the file
+    unmatched: list[str] = field(default_factory=list)
 
-    connection: Session = next(get_db())
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
 
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user_id).first()
 
-    if not watchlist:
-        logger.info(f"Watchlist not found for user {user_id}, creating new watchlist")
-        watchlist = Watchlist(user_id=user_id)
-        connection.add(watchlist)
-        connection.commit()  # Commit to ensure the new watchlist has an ID
+def iter_mal_entries(xml_file: BinaryIO) -> Iterator[tuple[str, str, int]]:
+    """(title, status, rating) of every <anime> of a MAL export, parsed
+    incrementally so only one entry is held in memory at a time."""
+    for _, element in ET.iterparse(xml_file, events=("end",)):
+        if element.tag != "anime":
+            continue
 
-    animes = root.findall("anime")
+        title = element.findtext("series_title") or ""
+        status = convert_from_mal_status(element.findtext("my_status") or "")
+        rating = int(element.findtext("my_score") or 0)
 
-    if not animes:
-        raise ValueError("No animes found in the XML file")
+        element.clear()
 
-    for anime in animes:
-        status = convert_from_mal_status(anime.find("my_status").text or "")  # type: ignore
-        rating = anime.find("my_score").text or 0  # type: ignore
+        yield title, status, rating
 
-        # Check if the anime already exists in the database
-        existing_anime = connection.query(Anime).filter(Anime.title == anime.find("series_title").text).first()  # type: ignore
 
-        logger.info(
-            f"Checking if anime {anime.find('series_title').text} exists in the database"  # type: ignore
-        )
+async def xml_to_watchlist(
+    connection: AsyncSession, xml_file: BinaryIO, user_id: int
+) -> MatchReport:
+    """
+    Add the entries of a MAL export to the user's watchlist. Titles are matched
+    exactly (after case and punctuation folding) against the catalog's titles and
+    synonyms in a compute worker, and the matches written with a single upsert.
+    """
+    version = await connection.run_sync(get_catalog_version)
+    watchlist = await get_or_create_watchlist(connection, user_id)
 
-        if not existing_anime:
-            logger.info(f"Anime did not exist in the database")
-            continue
+    report = MatchReport()
+    entries: dict[int, dict[str, Any]] = {}
+    mal_entries = iter_mal_entries(xml_file)
 
-        entry = (
-            connection.query(WatchlistToAnime)
-            .filter(
-                WatchlistToAnime.watchlist_id == watchlist.id,
-                WatchlistToAnime.anime_id == existing_anime.id,
-            )
-            .first()
+    while batch := list(islice(mal_entries, MATCH_BATCH_SIZE)):
+        matches = await compute.run(
+            match_titles, version, [title for title, _, _ in batch]
         )
 
-        if entry:
-            logger.info(f"Anime {existing_anime.title} already exists in the watchlist")
-            logger.info("Attempting to override rating")
-            entry.rating = rating  # type: ignore
-            connection.commit()
-            continue
+        for (title, status, rating), match in zip(batch, matches):
+            report.total += 1
+
+            if match is None:
+                report.unmatched.append(title)
+                continue
 
-        # Create a WatchlistToAnime entry
-        watchlist_to_anime = WatchlistToAnime(
-            watchlist_id=watchlist.id,
-            anime_id=existing_anime.id,
-            status=status,
-            rating=rating,
+            anime_id, by_synonym = match
+
+            if anime_id in entries:
+                report.duplicates += 1
+            elif by_synonym:
+                report.matched_by_synonym += 1
+            else:
+                report.matched_by_title += 1
+
+            entries[anime_id] = {
+                "watchlist_id": watchlist.id,
+                "anime_id": anime_id,
+                "status": status,
+                "rating": rating,
+            }
+
+    if not report.total:
+        raise ValueError("No animes found in the XML file")
+
+    # Existing entries only get their rating overridden
+    async with track_watchlist_stats(connection, watchlist.id, list(entries)):
+        await upsert_watchlist_entries(
+            connection, list(entries.values()), update_columns=["rating"]
         )
 
-        connection.add(watchlist_to_anime)
+    await connection.commit()
+
+    logger.info(
+        f"Imported {len(entries)} of {report.total} MAL entries for user {user_id}"
+    )
 
-    # Commit all changes to the database
-    connection.commit()
-    connection.close()
+    return report
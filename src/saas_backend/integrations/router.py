@@ -1,47 +1,112 @@
+from typing import Any, Literal
+from xml.etree.ElementTree import ParseError
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from saas_backend.auth.database import get_db
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from saas_backend.cache import AsyncLoadingCache
+from saas_backend.config import IntegrationConfig, get_config
+from saas_backend.auth.database import get_async_db
 from saas_backend.auth.models import User, Watchlist, WatchlistToAnime, Anime
 from saas_backend.auth.user_manager.user_manager import UserManager
+from saas_backend.anime.watchlist import (
+    get_or_create_watchlist,
+    upsert_watchlist_entries,
+)
+from saas_backend.anime.watchlist_stats import track_watchlist_stats
+from saas_backend.integrations.upstream import upstream
 from saas_backend.integrations.convert_to_watchlist import xml_to_watchlist
 from saas_backend.integrations.request_models import (
     RadarrAddRequest,
     SonarrAddRequest,
 )
-from saas_backend.utils import read_config, to_dict
-import requests
+from saas_backend.utils import (
+    JSON_CHUNK_SIZE,
+    agzip,
+    astream_json,
+    astream_ndjson,
+)
+import httpx
 import json
+import os
+import zlib
 import logging
 
 logger = logging.getLogger("integrations-router")
 
+LOOKUP_CACHE_SIZE = int(os.getenv("LOOKUP_CACHE_SIZE", 1000))
+LOOKUP_CACHE_TTL = float(os.getenv("LOOKUP_CACHE_TTL", 300))
+
+# (integration, its url, normalized query) -> the upstream's lookup results
+lookup_cache: AsyncLoadingCache[tuple[str, str, str], Any] = AsyncLoadingCache(
+    LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL
+)
+
 router = APIRouter(prefix="/integrations", tags=["integrations"])
 
 
 @router.get("/jellyfin")
 async def get_jellyfin_integrations():
-    config = read_config("jellyfin")
-    return config
+    return get_config().jellyfin
 
 
-@router.get("/sonarr/search")
-async def search_sonarr(query: str):
-    config = read_config("sonarr")
+def get_integration(name: str) -> IntegrationConfig:
+    integration = get_config().integration(name.lower())
 
-    response = requests.get(
-        f"{config['url']}/api/v3/series/lookup?term={query}&apiKey={config['api_key']}"
-    )
+    if integration is None:
+        raise HTTPException(status_code=404, detail=f"{name} is not configured")
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return integration
 
-    return response.json()
+
+async def call_upstream(name: str, method: str, url: str, **kwargs: Any):
+    try:
+        return await upstream.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        logger.error(f"Error calling {name}: {e!r}")
+        raise HTTPException(status_code=502, detail=f"Could not reach {name}")
+
+
+async def cached_lookup(name: str, path: str, query: str):
+    """
+    Sonarr/Radarr lookups are the same for every user, so successful ones are
+    cached per integration and normalized query, see LOOKUP_CACHE_*.
+    """
+    config = get_integration(name)
+    term = " ".join(query.lower().split())
+
+    async def lookup():
+        response = await call_upstream(
+            name,
+            "GET",
+            f"{config.url}{path}",
+            params={"term": term, "apiKey": config.api_key},
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+
+        return response.json()
+
+    return await lookup_cache.get((name, config.url, term), lookup)
+
+
+@router.get("/sonarr/search")
+async def search_sonarr(query: str):
+    return await cached_lookup("Sonarr", "/api/v3/series/lookup", query)
 
 
 @router.post("/sonarr/add")
 async def add_sonarr_series(request: SonarrAddRequest):
-    config = read_config("sonarr")
-    url = f"{config['url']}/api/v3/series?apiKey={config['api_key']}"
-    response = requests.post(url, json=request.model_dump())
+    config = get_integration("Sonarr")
+
+    response = await call_upstream(
+        "Sonarr",
+        "POST",
+        f"{config.url}/api/v3/series",
+        params={"apiKey": config.api_key},
+        json=request.model_dump(),
+    )
 
     print(response.status_code)
 
@@ -50,23 +115,20 @@ async def add_sonarr_series(request: SonarrAddRequest):
 
 @router.get("/radarr/search")
 async def search_radarr(query: str):
-    config = read_config("radarr")
-
-    response = requests.get(
-        f"{config['url']}/api/v3/movie/lookup?term={query}&apiKey={config['api_key']}"
-    )
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.text)
-
-    return response.json()
+    return await cached_lookup("Radarr", "/api/v3/movie/lookup", query)
 
 
 @router.post("/radarr/add")
 async def add_radarr_series(request: RadarrAddRequest):
-    config = read_config("radarr")
-    url = f"{config['url']}/api/v3/movie?apiKey={config['api_key']}"
-    response = requests.post(url, json=request.model_dump())
+    config = get_integration("Radarr")
+
+    response = await call_upstream(
+        "Radarr",
+        "POST",
+        f"{config.url}/api/v3/movie",
+        params={"apiKey": config.api_key},
+        json=request.model_dump(),
+    )
 
     print(response.status_code)
 
@@ -76,17 +138,15 @@ async def add_radarr_series(request: RadarrAddRequest):
 @router.get("/settings")
 async def get_settings():
     try:
-        sonarr_config = read_config("sonarr")
-        radarr_config = read_config("radarr")
-        jellyfin_config = read_config("jellyfin")
+        config = get_config()
 
         enabled_integrations = []
 
-        if sonarr_config:
+        if config.sonarr:
             enabled_integrations.append("sonarr")
-        if radarr_config:
+        if config.radarr:
             enabled_integrations.append("radarr")
-        if jellyfin_config:
+        if config.jellyfin:
             enabled_integrations.append("jellyfin")
 
         logger.info(f"Enabled integrations: {enabled_integrations}")
@@ -99,83 +159,119 @@ async def get_settings():
 
 @router.post("/upload")
 async def upload_file(
-    file: UploadFile = File(...), user: User = Depends(UserManager.get_user_from_header)
+    file: UploadFile = File(...),
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
 ):
-    xml_to_watchlist(file.file, user_id=user.id)
+    try:
+        report = await xml_to_watchlist(connection, file.file, user_id=user.id)
+    except (ValueError, ParseError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid MAL export: {e}")
 
-    return {"message": "XML file converted to watchlist"}
+    return {"message": "XML file converted to watchlist", **report.to_dict()}
 
 
 @router.get("/export")
-async def export_watchlist(user: User = Depends(UserManager.get_user_from_header)):
-    connection = next(get_db())
-
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()  # type: ignore
+async def export_watchlist(
+    format: Literal["json", "ndjson"] = "json",
+    gzip: bool = False,
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
+):
+    """
+    The watchlist's entries with their anime, as {"watchlist": [...]} or as NDJSON
+    with one entry per line, optionally gzipped. Rows are read and written out
+    `JSON_CHUNK_SIZE` at a time, so memory stays bounded for large watchlists.
+    """
+    watchlist_id = await connection.scalar(
+        select(Watchlist.id).where(Watchlist.user_id == user.id)
+    )
 
-    if not watchlist:
+    if watchlist_id is None:
         raise HTTPException(status_code=404, detail="Watchlist not found")
 
-    watchlist_to_animes = connection.query(WatchlistToAnime).filter(WatchlistToAnime.watchlist_id == watchlist.id).all()  # type: ignore
+    # The entry's status replaces the anime's airing status, as import expects
+    rows = await connection.stream(
+        select(
+            *(column for column in Anime.__table__.columns if column.name != "status"),
+            WatchlistToAnime.rating.label("user_rating"),
+            WatchlistToAnime.status.label("status"),
+        )
+        .join(WatchlistToAnime, WatchlistToAnime.anime_id == Anime.id)
+        .where(WatchlistToAnime.watchlist_id == watchlist_id)
+        .order_by(Anime.id)
+        .execution_options(yield_per=JSON_CHUNK_SIZE)
+    )
+    chunks = (
+        [dict(row) for row in partition]
+        async for partition in rows.mappings().partitions()
+    )
 
-    compiled_watchlist = []
+    if format == "ndjson":
+        content, media_type = astream_ndjson(chunks), "application/x-ndjson"
+    else:
+        content, media_type = astream_json({}, "watchlist", chunks), "application/json"
 
-    for watchlist_to_anime in watchlist_to_animes:
-        anime = connection.query(Anime).filter(Anime.id == watchlist_to_anime.anime_id).first()  # type: ignore
-        compiled_watchlist.append(
-            {
-                **to_dict(anime),
-                "user_rating": watchlist_to_anime.rating,
-                "status": watchlist_to_anime.status,
-            }
-        )
+    filename = f"watchlist.{format}"
 
-    return {"watchlist": compiled_watchlist}
+    if gzip:
+        content, media_type = agzip(content), "application/gzip"
+        filename += ".gz"
 
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-@router.post("/import")
-async def import_watchlist(
-    file: UploadFile = File(...), user: User = Depends(UserManager.get_user_from_header)
-):
-    logger.info(f"Importing watchlist for user {user.username}")
 
-    connection = next(get_db())
-    data = json.loads(await file.read())
+def read_export(data: bytes) -> list[dict[str, Any]]:
+    """The entries of an export in any of the formats of export_watchlist."""
+    if data[:2] == b"\x1f\x8b":
+        data = zlib.decompress(data, wbits=31)
 
-    watchlist = connection.query(Watchlist).filter(Watchlist.user_id == user.id).first()  # type: ignore
+    try:
+        document = json.loads(data)
+    except json.JSONDecodeError:
+        document = None
 
-    if not watchlist:
-        logger.info(
-            f"Watchlist not found for user {user.username}, creating new watchlist"
-        )
-        connection.add(Watchlist(user_id=user.id))
-        connection.commit()
-    else:
-        logger.info(f"Watchlist found for user {user.username}")
+    if isinstance(document, dict) and "watchlist" in document:
+        return document["watchlist"]
 
-    for anime in data["watchlist"]:
-        watchlist_to_anime_entry = (
-            connection.query(WatchlistToAnime)
-            .filter(WatchlistToAnime.anime_id == anime["id"])
-            .first()
-        )
+    return [json.loads(line) for line in data.splitlines() if line.strip()]
 
-        if not watchlist_to_anime_entry:
-            watchlist_to_anime = WatchlistToAnime(
-                watchlist_id=watchlist.id,  # type: ignore
-                anime_id=anime["id"],
-                rating=anime["user_rating"],
-                status=anime["status"],
-            )
 
-            logger.info(f"Adding watchlist to anime {anime['id']}")
-            connection.add(watchlist_to_anime)
-        else:
-            watchlist_to_anime_entry.rating = anime["user_rating"]
-            watchlist_to_anime_entry.status = anime["status"]
+@router.post("/import")
+async def import_watchlist(
+    file: UploadFile = File(...),
+    user: User = Depends(UserManager.get_user_from_header),
+    connection: AsyncSession = Depends(get_async_db),
+):
+    logger.info(f"Importing watchlist for user {user.username}")
+
+    entries = read_export(await file.read())
+
+    watchlist = await get_or_create_watchlist(connection, user.id)
+
+    async with track_watchlist_stats(
+        connection, watchlist.id, [anime["id"] for anime in entries]
+    ):
+        await upsert_watchlist_entries(
+            connection,
+            [
+                {
+                    "watchlist_id": watchlist.id,
+                    "anime_id": anime["id"],
+                    "rating": anime["user_rating"],
+                    "status": anime["status"],
+                }
+                for anime in entries
+            ],
+            update_columns=["rating", "status"],
+        )
 
-            logger.info(f"Updating watchlist to anime {anime['id']}")
-            connection.add(watchlist_to_anime_entry)
+    logger.info(f"Imported {len(entries)} anime for user {user.username}")
 
-    connection.commit()
+    await connection.commit()
 
     return {"message": "Watchlist imported"}
@@ -0,0 +1,116 @@
+# STL
+import os
+import asyncio
+from typing import Any
+
+# PDM
+import httpx
+
+# LOCAL
+from saas_backend.logger import LOG
+
+# Seconds to wait for a connection, and for each read/write once connected
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 5))
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 30))
+# Pooled keep-alive connections, and requests in flight at once across all users
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 20))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", 10))
+# Attempts after the first one, waiting UPSTREAM_BACKOFF * 2^n seconds before each
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", 2))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", 0.5))
+
+# Responses worth retrying: the upstream or a proxy in front of it is overloaded
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class UpstreamClient:
+    """
+    Shared async HTTP client for the *arr integrations. Connections are pooled and
+    kept alive, every request has a timeout, at most `max_concurrency` requests
+    are in flight at once, and failed attempts are retried with exponential
+    backoff. Requests that may have reached the upstream (timeouts, error
+    responses) are only retried for idempotent methods.
+    """
+
+    def __init__(
+        self,
+        retries: int = UPSTREAM_RETRIES,
+        backoff: float = UPSTREAM_BACKOFF,
+        max_concurrency: int = UPSTREAM_MAX_CONCURRENCY,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # The pool and semaphore belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+
+        if self._client is None or self._semaphore is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+
+        return self._client, self._semaphore
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client, semaphore = self._bind()
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            try:
+                async with semaphore:
+                    response = await client.request(method, url, **kwargs)
+
+                if (
+                    not idempotent
+                    or response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.retries
+                ):
+                    return response
+
+                LOG.warning(f"{method} {url} returned {response.status_code}")
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Nothing was sent, any method can be retried
+                if attempt >= self.retries:
+                    raise
+
+                LOG.warning(f"{method} {url} could not connect: {e}")
+            except httpx.TransportError as e:
+                if not idempotent or attempt >= self.retries:
+                    raise
+
+                LOG.warning(f"{method} {url} failed: {e}")
+
+            await asyncio.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+upstream = UpstreamClient()
@@ -0,0 +1,72 @@
+# STL
+import os
+import time
+
+# PDM
+import numpy as np
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.auth.database import SessionLocal
+from saas_backend.anime.recommender import (
+    SIMILARITY_INDEX_PATH,
+    recommendation_engine,
+)
+
+SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", 50))
+SIMILARITY_CHUNK_SIZE = int(os.getenv("SIMILARITY_CHUNK_SIZE", 256))
+
+
+def build_similarity_index(
+    path: str = SIMILARITY_INDEX_PATH,
+    top_k: int = SIMILARITY_TOP_K,
+    chunk_size: int = SIMILARITY_CHUNK_SIZE,
+):
+    connection = SessionLocal()
+    start = time.perf_counter()
+
+    model = recommendation_engine.refresh(connection)
+    connection.close()
+
+    matrix = model.matrix
+    matrix_t = matrix.T.tocsc()
+    row_count = matrix.shape[0]
+    top_k = max(min(top_k, row_count - 1), 0)
+
+    neighbours = np.zeros((row_count, top_k), dtype=np.int32)
+    scores = np.zeros((row_count, top_k), dtype=np.float32)
+
+    for chunk_start in range(0, row_count if top_k else 0, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, row_count)
+        rows = np.arange(chunk_end - chunk_start)
+
+        block = (matrix[chunk_start:chunk_end] @ matrix_t).toarray()
+        block[rows, rows + chunk_start] = -np.inf  # an anime is not its own neighbour
+
+        top = np.argpartition(block, -top_k, axis=1)[:, -top_k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+
+        neighbours[chunk_start:chunk_end] = np.take_along_axis(top, order, axis=1)
+        scores[chunk_start:chunk_end] = np.take_along_axis(top_scores, order, axis=1)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+
+    np.savez(
+        tmp_path,
+        version=np.asarray(model.version, dtype=np.int64),
+        anime_ids=model.anime_ids,
+        neighbours=neighbours,
+        scores=scores,
+    )
+    os.replace(tmp_path, path)
+
+    elapsed = time.perf_counter() - start
+    LOG.info(
+        f"Built top-{top_k} similarity index for {row_count} anime in {elapsed:.2f}s at {path}"
+    )
+
+
+if __name__ == "__main__":
+    build_similarity_index()
@@ -1,70 +1,203 @@
 # STL
 import os
 import json
+import time
+import resource
+from typing import Any, TextIO
+from collections.abc import Iterator
+
+# PDM
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
 
 # LOCAL
+from saas_backend.logger import LOG
+from saas_backend.anime.tags import replace_anime_tags
+from saas_backend.anime.catalog import bump_catalog_version
 from saas_backend.auth.models import Anime
-from saas_backend.auth.database import get_db
+from saas_backend.auth.database import SessionLocal
 
 JSON_DATA_PATH = os.getenv(
     "JSON_DATA_PATH", "./offline-data/anime-offline-database.json"
 )
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", 1000))
+READ_BUFFER_SIZE = 1 << 20
+
+
+class JsonStream:
+    """
+    Minimal incremental JSON reader: values are decoded one at a time with
+    `JSONDecoder.raw_decode` from a buffer that only ever holds the current chunk.
+    """
+
+    def __init__(self, file: TextIO, buffer_size: int = READ_BUFFER_SIZE):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.file.read(self.buffer_size)
+
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or "" at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the JSON data")
+
+        self.pos += 1
+
+    def value(self) -> Any:
+        _ = self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+
+                # A value ending exactly at the buffer end may be a truncated number
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            _ = self._fill()
+
+
+def iter_offline_database(
+    path: str = JSON_DATA_PATH, buffer_size: int = READ_BUFFER_SIZE
+) -> Iterator[dict[str, Any]]:
+    """Yield the entries of the offline database's `data` array one at a time."""
+    with open(path, "r") as f:
+        stream = JsonStream(f, buffer_size)
+        stream.expect("{")
 
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
 
-def load_database():
-    connection = next(get_db())
-
-    with open(JSON_DATA_PATH, "r") as f:
-        raw_data = json.load(f)
-
-    print(len(raw_data["data"]))
-
-    for anime in raw_data["data"]:
-        # Get score if it exists, then get median if score exists
-        score = anime.get("score", {})
-        rating = score.get("median") if score else None
-
-        # Get anime season if it exists
-        anime_season = anime.get("animeSeason", {})
-        year = anime_season.get("year") if anime_season else None
-        season = anime_season.get("season") if anime_season else None
-
-        anime_model = Anime(
-            title=anime.get("title"),
-            image_url=anime.get("picture"),
-            rating=rating,
-            status=anime.get("status"),
-            year=year,
-            season=season,
-            episode_count=anime.get("episodes"),
-            tags=anime.get("tags", []),
-            sources=anime.get("sources", []),
-            extra_titles=anime.get("synonyms", []),
-            reccomendation_string=" ".join(
-                filter(
-                    None,
-                    [
-                        anime.get("title", ""),
-                        anime.get("season", ""),
-                        str(anime.get("year", "")),
-                        " ".join(anime.get("tags", [])),
-                        " ".join(anime.get("sources", [])),
-                        " ".join(anime.get("synonyms", [])),
-                        anime.get("status", ""),
-                        str(anime.get("episodes", "")),
-                        anime.get("description", ""),
-                        " ".join(anime.get("genres", [])),
-                        " ".join(anime.get("demographics", [])),
-                    ],
-                )
-            ),
-        )
-
-        connection.add(anime_model)
+            if key != "data":
+                _ = stream.value()
+            else:
+                stream.expect("[")
+
+                while stream.peek() != "]":
+                    yield stream.value()
+
+                    if stream.peek() == ",":
+                        stream.expect(",")
+
+                stream.expect("]")
+
+            if stream.peek() == ",":
+                stream.expect(",")
+
+
+def to_anime_row(anime: dict[str, Any]) -> dict[str, Any]:
+    # Get score if it exists, then get median if score exists
+    score = anime.get("score", {})
+    rating = score.get("median") if score else None
+
+    # Get anime season if it exists
+    anime_season = anime.get("animeSeason", {})
+    year = anime_season.get("year") if anime_season else None
+    season = anime_season.get("season") if anime_season else None
+
+    return {
+        "title": anime.get("title"),
+        "image_url": anime.get("picture"),
+        "rating": rating,
+        "status": anime.get("status"),
+        "year": year,
+        "season": season,
+        "episode_count": anime.get("episodes"),
+        "tags": anime.get("tags", []),
+        "sources": anime.get("sources", []),
+        "extra_titles": anime.get("synonyms", []),
+        "reccomendation_string": " ".join(
+            filter(
+                None,
+                [
+                    anime.get("title", ""),
+                    anime.get("season", ""),
+                    str(anime.get("year", "")),
+                    " ".join(anime.get("tags", [])),
+                    " ".join(anime.get("sources", [])),
+                    " ".join(anime.get("synonyms", [])),
+                    anime.get("status", ""),
+                    str(anime.get("episodes", "")),
+                    anime.get("description", ""),
+                    " ".join(anime.get("genres", [])),
+                    " ".join(anime.get("demographics", [])),
+                ],
+            )
+        ),
+    }
+
+
+def insert_anime_rows(connection: Session, rows: list[dict[str, Any]]) -> None:
+    """Bulk insert anime rows (with explicit ids) and their anime_tag rows."""
+    _ = connection.execute(insert(Anime), rows)
+    replace_anime_tags(connection, {row["id"]: row["tags"] for row in rows})
+
+
+def load_database(path: str = JSON_DATA_PATH, chunk_size: int = LOAD_CHUNK_SIZE):
+    connection = SessionLocal()
+    start = time.perf_counter()
+
+    # Ids are assigned up front so the anime_tag rows can be inserted with each chunk
+    next_id = (connection.query(func.max(Anime.id)).scalar() or 0) + 1
+    loaded = 0
+    chunk: list[dict[str, Any]] = []
+
+    for anime in iter_offline_database(path):
+        chunk.append({"id": next_id, **to_anime_row(anime)})
+        next_id += 1
+
+        if len(chunk) >= chunk_size:
+            insert_anime_rows(connection, chunk)
+            loaded += len(chunk)
+            chunk = []
+
+    if chunk:
+        insert_anime_rows(connection, chunk)
+        loaded += len(chunk)
+
+    _ = bump_catalog_version(connection)
 
     connection.commit()
     connection.close()
 
+    elapsed = time.perf_counter() - start
+    rows_per_second = loaded / elapsed if elapsed else 0
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    LOG.info(
+        f"Loaded {loaded} anime in {elapsed:.2f}s ({rows_per_second:.0f} rows/s, peak RSS {peak_rss_mb:.0f} MB)"
+    )
+
 
 if __name__ == "__main__":
     load_database()
@@ -0,0 +1,153 @@
+# STL
+import sys
+import time
+from typing import Any
+
+# PDM
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+# LOCAL
+from saas_backend.logger import LOG
+from saas_backend.anime.tags import replace_anime_tags
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+from saas_backend.auth.database import SessionLocal
+from saas_backend.scripts.load_database import (
+    JSON_DATA_PATH,
+    LOAD_CHUNK_SIZE,
+    to_anime_row,
+    insert_anime_rows,
+    iter_offline_database,
+)
+
+CONTENT_COLUMNS = [
+    "title",
+    "image_url",
+    "rating",
+    "status",
+    "year",
+    "season",
+    "episode_count",
+    "tags",
+    "sources",
+    "extra_titles",
+    "reccomendation_string",
+]
+
+
+def apply_chunk(
+    connection: Session, matched: dict[int, dict[str, Any]], new: list[dict[str, Any]]
+) -> int:
+    """Update the matched rows whose content changed and insert the new ones."""
+    columns = [getattr(Anime, column) for column in CONTENT_COLUMNS]
+    current = {
+        row[0]: row
+        for row in connection.query(Anime.id, Anime.removed, *columns).filter(
+            Anime.id.in_(list(matched))
+        )
+    }
+
+    changed = [
+        {"id": anime_id, "removed": False, **row}
+        for anime_id, row in matched.items()
+        if current[anime_id][1]  # re-added after being removed
+        or list(current[anime_id][2:]) != [row[column] for column in CONTENT_COLUMNS]
+    ]
+
+    if changed:
+        _ = connection.execute(update(Anime), changed)
+        replace_anime_tags(connection, {row["id"]: row["tags"] for row in changed})
+
+    if new:
+        insert_anime_rows(connection, new)
+
+    return len(changed)
+
+
+def refresh_database(path: str = JSON_DATA_PATH, chunk_size: int = LOAD_CHUNK_SIZE):
+    """
+    Apply a new offline-database release to the anime table.
+
+    Entries are matched to existing anime by their source URLs: changed rows are
+    updated in place, unseen entries are inserted and anime missing from the
+    release are marked as removed. The catalog version is bumped when anything
+    changed, which invalidates the search index and recommendation caches.
+    """
+    connection = SessionLocal()
+    start = time.perf_counter()
+
+    anime_by_source: dict[str, int] = {}
+    active_ids: set[int] = set()
+
+    for anime_id, sources, removed in connection.query(
+        Anime.id, Anime.sources, Anime.removed
+    ):
+        for source in sources or []:
+            anime_by_source.setdefault(source, anime_id)
+
+        if not removed:
+            active_ids.add(anime_id)
+
+    next_id = (connection.query(func.max(Anime.id)).scalar() or 0) + 1
+    seen_ids: set[int] = set()
+    matched: dict[int, dict[str, Any]] = {}
+    new: list[dict[str, Any]] = []
+    inserted = updated = unchanged = 0
+
+    for anime in iter_offline_database(path):
+        row = to_anime_row(anime)
+        anime_id = next(
+            (
+                anime_by_source[source]
+                for source in row["sources"]
+                if source in anime_by_source and anime_by_source[source] not in seen_ids
+            ),
+            None,
+        )
+
+        if anime_id is None:
+            new.append({"id": next_id, **row})
+            next_id += 1
+        else:
+            seen_ids.add(anime_id)
+            matched[anime_id] = row
+
+        if len(matched) + len(new) >= chunk_size:
+            changed = apply_chunk(connection, matched, new)
+            inserted, updated = inserted + len(new), updated + changed
+            unchanged += len(matched) - changed
+            matched, new = {}, []
+
+    changed = apply_chunk(connection, matched, new)
+    inserted, updated = inserted + len(new), updated + changed
+    unchanged += len(matched) - changed
+
+    removed_ids = list(active_ids - seen_ids)
+
+    if removed_ids:
+        _ = (
+            connection.query(Anime)
+            .filter(Anime.id.in_(removed_ids))
+            .update({"removed": True}, synchronize_session=False)
+        )
+
+    version = None
+
+    if inserted or updated or removed_ids:
+        version = bump_catalog_version(connection)
+
+    connection.commit()
+    connection.close()
+
+    elapsed = time.perf_counter() - start
+    removed = len(removed_ids)
+    new_version = f", catalog version is now {version}" if version else ""
+
+    LOG.info(
+        f"Refreshed catalog in {elapsed:.2f}s: {inserted} inserted, {updated} updated, {unchanged} unchanged, {removed} removed{new_version}"
+    )
+
+
+if __name__ == "__main__":
+    refresh_database(*sys.argv[1:2])
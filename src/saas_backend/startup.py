@@ -10,54 +10,65 @@ from saas_backend.auth.models import (
     AnimeStatus,
     WatchlistToAnime,
 )
-from saas_backend.auth.database import get_db
+from saas_backend.auth.database import SessionLocal
+from saas_backend.anime.compute import compute
+from saas_backend.anime.recommender import recommendation_engine
+from saas_backend.anime.search_index import title_index
+from saas_backend.auth.jwt_handler.revocations import revocations, unexpired_revocations
 from saas_backend.scripts.load_database import load_database
 
 
 def on_startup():
-    connection = next(get_db())
+    with SessionLocal() as connection:
+        if not connection.query(Anime).count():
+            load_database()
 
-    if not connection.query(Anime).count():
-        load_database()
+        # With a compute pool only its workers search and recommend, and they build
+        # the caches themselves when they start
+        if compute.workers <= 0:
+            _ = recommendation_engine.refresh(connection)
+            _ = title_index.refresh(connection)
 
-    admin_user = connection.query(User).filter(User.username == "admin").first()
+        revocations.load(connection.execute(unexpired_revocations()))
 
-    if not admin_user:
-        admin_user = User(
-            id=999,
-            username="admin",
-            email="admin@admin.com",
-            hashed_password=hashlib.sha256("admin".encode()).hexdigest(),
-        )
+        admin_user = connection.query(User).filter(User.username == "admin").first()
 
-    connection.add(admin_user)
+        if not admin_user:
+            admin_user = User(
+                id=999,
+                username="admin",
+                email="admin@admin.com",
+                hashed_password=hashlib.sha256("admin".encode()).hexdigest(),
+            )
 
-    if os.getenv("APP_MODE") == "PROD":
-        print("Production mode, skipping watchlist setup...")
-        connection.commit()
-        connection.close()
-        return
+        connection.add(admin_user)
 
-    watchlist = (
-        connection.query(Watchlist).filter(Watchlist.user_id == admin_user.id).first()
-    )
+        if os.getenv("APP_MODE") == "PROD":
+            print("Production mode, skipping watchlist setup...")
+            connection.commit()
+            return
 
-    if not watchlist:
-        watchlist = Watchlist(id=999, user_id=admin_user.id)
+        watchlist = (
+            connection.query(Watchlist)
+            .filter(Watchlist.user_id == admin_user.id)
+            .first()
+        )
 
-    anime_to_watchlist = (
-        connection.query(WatchlistToAnime)
-        .filter(WatchlistToAnime.watchlist_id == watchlist.id)
-        .first()
-    )
+        if not watchlist:
+            watchlist = Watchlist(id=999, user_id=admin_user.id)
 
-    if not anime_to_watchlist:
-        anime_to_watchlist = WatchlistToAnime(
-            watchlist_id=999, anime_id=20766, status=AnimeStatus.WATCHED, rating=10
+        anime_to_watchlist = (
+            connection.query(WatchlistToAnime)
+            .filter(WatchlistToAnime.watchlist_id == watchlist.id)
+            .first()
         )
 
-    connection.add(watchlist)
-    connection.add(anime_to_watchlist)
+        if not anime_to_watchlist:
+            anime_to_watchlist = WatchlistToAnime(
+                watchlist_id=999, anime_id=20766, status=AnimeStatus.WATCHED, rating=10
+            )
 
-    connection.commit()
-    connection.close()
+        connection.add(watchlist)
+        connection.add(anime_to_watchlist)
+
+        connection.commit()
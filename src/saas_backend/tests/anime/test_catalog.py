@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.anime.catalog import (
+    CatalogCache,
+    CatalogVersion,
+    bump_catalog_version,
+)
+
+
+class CountingCache(CatalogCache[tuple[CatalogVersion, int]]):
+    def __init__(self):
+        super().__init__()
+        self.builds = 0
+
+    def build(self, connection: Session, version: CatalogVersion):
+        self.builds += 1
+        return version, self.builds
+
+
+def test_rebuilt_only_when_the_version_changes():
+    with TestingSessionLocal() as db:
+        cache = CountingCache()
+
+        assert cache.get(db) == (0, 1)
+        assert cache.get(db) == (0, 1)
+        assert cache.peek(0) == (0, 1)
+        assert cache.peek(1) is None
+
+        _ = bump_catalog_version(db)
+        db.commit()
+
+        assert cache.get(db) == (1, 2)
+        assert cache.peek(0) is None
+        assert cache.get(db) == (1, 2)
+
+        # refresh rebuilds even when the version is unchanged
+        assert cache.refresh(db) == (1, 3)
+        assert cache.get(db) == (1, 3)
+
+
+def test_build_must_be_implemented():
+    class NoBuild(CatalogCache[int]):
+        pass
+
+    with pytest.raises(TypeError):
+        _ = NoBuild()  # pyright: ignore[reportAbstractUsage]
@@ -0,0 +1,74 @@
+import time
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from saas_backend import startup
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.anime import search_index
+from saas_backend.anime.compute import ComputeExecutor, init_worker, search_titles
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+from saas_backend.anime.recommender import recommendation_engine
+from saas_backend.anime.search_index import title_index
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_search_their_own_catalog():
+    with TestingSessionLocal() as db:
+        db.add_all([Anime(id=1, title="Cowboy Bebop"), Anime(id=2, title="Trigun")])
+        _ = bump_catalog_version(db)
+        db.commit()
+
+    executor = ComputeExecutor(workers=1, database_url="sqlite:///test.db")
+
+    try:
+        assert await executor.run(search_titles, 1, ["trigun"], 1) == [[2]]
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize("pooled, search_workers", [(False, -1), (True, 1)])
+def test_pool_workers_score_on_one_thread(
+    monkeypatch: pytest.MonkeyPatch, pooled: bool, search_workers: int
+):
+    monkeypatch.delenv("SEARCH_WORKERS", raising=False)
+    monkeypatch.setattr(search_index, "SEARCH_WORKERS", -1)
+
+    init_worker("sqlite:///test.db", pooled=pooled)
+
+    assert search_index.SEARCH_WORKERS == search_workers
+
+
+@pytest.mark.asyncio
+async def test_rejects_calls_past_capacity():
+    executor = ComputeExecutor(workers=0, queue_size=1)
+
+    results = await asyncio.gather(
+        *(executor.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+    )
+
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], HTTPException) and results[2].status_code == 429
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("workers, builds", [(0, 2), (2, 0)])
+def test_startup_builds_caches_only_without_workers(
+    monkeypatch: pytest.MonkeyPatch, workers: int, builds: int
+):
+    refreshed: list[Session] = []
+
+    monkeypatch.setattr(startup, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(startup, "load_database", lambda: None)
+    monkeypatch.setattr(startup.compute, "workers", workers)
+
+    for cache in [recommendation_engine, title_index]:
+        monkeypatch.setattr(cache, "refresh", refreshed.append)
+
+    startup.on_startup()
+
+    assert len(refreshed) == builds
@@ -0,0 +1,129 @@
+import numpy as np
+
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+from saas_backend.anime.recommender import (
+    RecommendationEngine,
+    SimilarityIndex,
+    RecommendationModel,
+    fit_tfidf,
+    recommend,
+    select_top_k,
+    score_preferences,
+)
+
+CORPUS = {
+    1: "space cowboy bounty hunter",
+    2: "space western cowboy gunman",
+    3: "space forest spirits",
+    4: "",
+}
+
+
+def model() -> RecommendationModel:
+    return RecommendationModel.from_arrays(1, fit_tfidf(list(CORPUS.items())))
+
+
+def test_score_preferences_is_cosine_similarity_to_the_weighted_mean():
+    catalog = model()
+    dense = catalog.matrix.toarray()
+
+    scores = score_preferences(catalog, [0, 1], [3.0, 1.0])
+
+    preference = (3 * dense[0] + dense[1]) / 4
+    expected = dense @ preference / np.linalg.norm(preference)
+    assert np.allclose(scores, expected)
+    assert scores[3] == 0
+
+
+def test_score_preferences_of_an_empty_document():
+    catalog = model()
+
+    assert score_preferences(catalog, [3], [1.0]).tolist() == [0, 0, 0, 0]
+
+
+def test_recommend_leaves_out_inputs_and_exclusions():
+    catalog = model()
+
+    assert recommend(catalog, [(1, 1.0)], [], 2) == [2, 3]
+    assert recommend(catalog, [(1, 1.0)], [2], 2) == [3, 4]
+    assert recommend(catalog, [(1, 1.0), (2, 1.0)], [], 5) == [3, 4]
+    assert recommend(catalog, [(99, 1.0)], [], 2) == []
+
+
+def test_engine_refits_when_the_catalog_changes():
+    with TestingSessionLocal() as db:
+        db.add_all(
+            Anime(id=anime_id, title=str(anime_id), reccomendation_string=text)
+            for anime_id, text in CORPUS.items()
+        )
+        _ = bump_catalog_version(db)
+        db.commit()
+
+        engine = RecommendationEngine()
+        first = engine.get(db)
+
+        assert engine.get(db) is first
+        assert first.anime_ids.tolist() == [1, 2, 3, 4]
+
+        db.add(Anime(id=5, title="5", reccomendation_string="bounty hunter opera"))
+        _ = bump_catalog_version(db)
+        db.commit()
+
+        second = engine.get(db)
+
+        assert second is not first
+        assert second.version == first.version + 1
+        assert second.anime_ids.tolist() == [1, 2, 3, 4, 5]
+        assert recommend(second, [(5, 1.0)], [], 1) == [1]
+
+
+def test_similarity_index_aggregates_weighted_neighbours():
+    index = SimilarityIndex(
+        version=1,
+        anime_ids=np.asarray([10, 20, 30, 40]),
+        id_to_index={10: 0, 20: 1, 30: 2, 40: 3},
+        neighbours=np.asarray([[1, 2], [2, 3], [0, 1], [0, 1]]),
+        scores=np.asarray([[0.8, 0.4], [0.5, 0.0], [0.4, 0.2], [0.1, 0.1]]),
+    )
+
+    candidates, scores = index.aggregate([0, 1], [3.0, 1.0])
+
+    # Neighbours with no similarity are dropped, shared ones are summed
+    assert candidates.tolist() == [1, 2]
+    assert np.allclose(scores, [0.75 * 0.8, 0.75 * 0.4 + 0.25 * 0.5])
+    assert recommend(index, [(10, 3.0), (20, 1.0)], [], 5) == [30]
+
+
+def test_select_top_k_orders_and_excludes():
+    scores = np.asarray([0.2, 0.9, 0.5, 0.7, 0.1])
+
+    assert select_top_k(scores, 3).tolist() == [1, 3, 2]
+
+    excluded = np.asarray([False, True, False, False, False])
+    assert select_top_k(scores, 2, excluded).tolist() == [3, 2]
+
+
+def test_select_top_k_sizes():
+    scores = np.asarray([0.2, 0.9, 0.5])
+    excluded = np.asarray([True, False, True])
+
+    # k past the number of scores, or of scores left after exclusions
+    assert select_top_k(scores, 3).tolist() == [1, 2, 0]
+    assert select_top_k(scores, 10).tolist() == [1, 2, 0]
+    assert select_top_k(scores, 10, excluded).tolist() == [1]
+    assert select_top_k(scores, 0).tolist() == []
+    assert select_top_k(scores, 2, np.ones(3, dtype=bool)).tolist() == []
+    assert select_top_k(np.empty(0), 5).tolist() == []
+
+
+def test_select_top_k_ties():
+    scores = np.asarray([0.5, 0.5, 0.5, 0.9])
+
+    # Which of the tied scores make the cut is unspecified, but never twice
+    for k in (2, 3, 4):
+        top = select_top_k(scores, k).tolist()
+
+        assert top[0] == 3
+        assert len(set(top)) == k and set(top[1:]) <= {0, 1, 2}
@@ -0,0 +1,137 @@
+import pytest
+
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.anime import router, search_index
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+from saas_backend.anime.search_index import TitleIndexStore
+
+
+def add_anime(titles: dict[int, tuple[str, list[str]]]):
+    with TestingSessionLocal() as db:
+        db.add_all(
+            Anime(id=anime_id, title=title, extra_titles=extra_titles)
+            for anime_id, (title, extra_titles) in titles.items()
+        )
+        db.commit()
+
+
+def get_index():
+    with TestingSessionLocal() as db:
+        return TitleIndexStore().get(db)
+
+
+class TestTitleIndex:
+    def test_fuzzy_and_synonym_matches(self):
+        add_anime(
+            {
+                1: ("Cowboy Bebop", ["Space Cowboys"]),
+                2: ("Trigun", ["Trigun Stampede"]),
+                3: ("Cowboy Bebop: The Movie", []),
+            }
+        )
+        index = get_index()
+
+        assert index.fuzzy_matches("cowboy bebop", 2) == [1, 3]
+        assert index.synonym_matches("STAMPEDE") == [2]
+        assert index.search("trigun", 1) == [2]
+
+    def test_search_many_keeps_query_order(self):
+        add_anime({1: ("Cowboy Bebop", []), 2: ("Trigun", [])})
+        index = get_index()
+
+        assert index.search_many(["trigun", "", "cowboy bebop"], 1) == [[2], [], [1]]
+
+    def test_trigram_prefilter_shortlists_candidates(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(search_index, "SEARCH_CANDIDATE_CAP", 2)
+        add_anime(
+            {
+                1: ("Cowboy Bebop", []),
+                2: ("Trigun", []),
+                3: ("Cowboy Bebop: The Movie", []),
+                4: ("Monster", []),
+            }
+        )
+        index = get_index()
+
+        assert index.candidates("cowboy bebop").tolist() == [0, 2]
+        assert index.fuzzy_matches("cowboy bebop", 5) == [1, 3]
+        assert index.candidates("xq") is None  # no shared trigram, full scan
+        assert len(index.fuzzy_matches("xq", 5)) == 4
+
+    def test_rebuilds_when_catalog_changes(self):
+        add_anime({1: ("Cowboy Bebop", [])})
+        store = TitleIndexStore()
+
+        with TestingSessionLocal() as db:
+            first = store.get(db)
+
+            assert store.get(db) is first
+
+            db.add(Anime(id=2, title="Trigun", extra_titles=[]))
+            _ = bump_catalog_version(db)
+            db.commit()
+
+            assert store.get(db) is not first
+            assert store.get(db).search("trigun", 1) == [2]
+
+
+class TestSearch:
+    def test_pages_share_one_result_list(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(router, "SEARCH_RESULT_LIMIT", 5)
+        titles = {anime_id: (f"Bebop {anime_id}", []) for anime_id in range(1, 13)}
+        titles[99] = ("Unrelated Show", ["The Extraordinarily Long Bebop Chronicle"])
+        add_anime(titles)
+
+        pages = [
+            client.get(
+                "/anime/search",
+                params={
+                    "query": "bebop",
+                    "limit": 4,
+                    "offset": offset,
+                    "total_count": True,
+                },
+            ).json()
+            for offset in [0, 4, 8]
+        ]
+
+        # Five fuzzy matches, then the synonym-only match
+        assert [page["total_count"] for page in pages] == [6, 6, 6]
+        assert [len(page["animes"]) for page in pages] == [4, 2, 0]
+
+        anime_ids = [anime["id"] for page in pages for anime in page["animes"]]
+
+        assert len(set(anime_ids)) == 6
+        assert anime_ids[-1] == 99
+
+
+class TestBatchSearch:
+    def test_results_follow_query_order(self):
+        add_anime({1: ("Cowboy Bebop", []), 2: ("Trigun", ["Trigun Stampede"])})
+
+        response = client.post(
+            "/anime/search/batch",
+            json={"queries": ["stampede", "cowboy bebop"], "limit": 1},
+        )
+
+        assert response.status_code == 200
+        assert [
+            (result["query"], [anime["id"] for anime in result["animes"]])
+            for result in response.json()
+        ] == [("stampede", [2]), ("cowboy bebop", [1])]
+
+    @pytest.mark.parametrize(
+        "request_body",
+        [
+            {"queries": ["trigun"], "limit": 0},
+            {"queries": ["trigun"], "limit": 51},
+            {"queries": ["trigun"] * 101},
+        ],
+    )
+    def test_limits_are_bounded(self, request_body: dict[str, object]):
+        response = client.post("/anime/search/batch", json=request_body)
+
+        assert response.status_code == 422
@@ -0,0 +1,116 @@
+import os
+import time
+import fcntl
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.anime.catalog import bump_catalog_version, get_snapshot_key
+from saas_backend.anime.snapshot import load_snapshot
+from saas_backend.auth.models import Anime
+
+
+def arrays():
+    return {"ids": np.arange(5, dtype=np.int64), "keys": np.asarray(["abc"], "<U3")}
+
+
+def snapshots(directory: Path) -> list[str]:
+    return sorted(entry.name for entry in directory.iterdir() if entry.is_dir())
+
+
+def test_built_once_then_attached(tmp_path: Path):
+    builds = 0
+
+    def build():
+        nonlocal builds
+        builds += 1
+        return arrays()
+
+    first = load_snapshot("titles", "v1", build, directory=str(tmp_path))
+    second = load_snapshot("titles", "v1", build, directory=str(tmp_path))
+
+    assert builds == 1
+    assert isinstance(second["ids"], np.memmap)
+    assert second["ids"].tolist() == first["ids"].tolist() == [0, 1, 2, 3, 4]
+    assert second["keys"].tolist() == ["abc"]
+
+
+def test_only_unmapped_snapshots_are_removed(tmp_path: Path):
+    v1 = load_snapshot("titles", "v1", arrays, directory=str(tmp_path))
+    _ = load_snapshot("tfidf", "v1", arrays, directory=str(tmp_path))
+    v2 = load_snapshot("titles", "v2", arrays, directory=str(tmp_path))
+
+    # v1 is still mapped here, so it survives the new snapshot, its build lock doesn't
+    assert snapshots(tmp_path) == ["tfidf-v1", "titles-v1", "titles-v2"]
+    assert not (tmp_path / "titles-v1.lock").exists()
+    assert v1["ids"].tolist() == [0, 1, 2, 3, 4]
+
+    del v1
+    _ = load_snapshot("titles", "v3", arrays, directory=str(tmp_path))
+
+    assert snapshots(tmp_path) == ["tfidf-v1", "titles-v2", "titles-v3"]
+    assert v2["ids"].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_concurrent_loads_build_once(tmp_path: Path):
+    builds = 0
+    building = threading.Event()
+
+    def build():
+        nonlocal builds
+        builds += 1
+        building.set()
+        time.sleep(0.2)
+        return arrays()
+
+    results: list[dict[str, np.ndarray]] = []
+
+    def load():
+        results.append(load_snapshot("titles", "v1", build, directory=str(tmp_path)))
+
+    first = threading.Thread(target=load)
+    first.start()
+    assert building.wait(5)
+
+    # Waits on the build lock, then attaches to the snapshot the first one wrote
+    load()
+    first.join()
+
+    assert builds == 1
+    assert [result["ids"].tolist() for result in results] == [[0, 1, 2, 3, 4]] * 2
+
+
+def test_abandoned_staging_directories_are_removed(tmp_path: Path):
+    abandoned = tmp_path / ".staging-abandoned"
+    in_progress = tmp_path / ".staging-in-progress"
+    abandoned.mkdir()
+    in_progress.mkdir()
+
+    fd = os.open(in_progress, os.O_RDONLY)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    try:
+        _ = load_snapshot("titles", "v1", arrays, directory=str(tmp_path))
+    finally:
+        os.close(fd)
+
+    assert not abandoned.exists()
+    assert in_progress.exists()
+
+
+def test_snapshot_key_follows_catalog():
+    with TestingSessionLocal() as db:
+        db.add(Anime(id=1, title="Trigun"))
+        _ = bump_catalog_version(db)
+        db.commit()
+
+        key = get_snapshot_key(db, 1)
+        assert key.startswith("1-")
+        assert get_snapshot_key(db, 1) == key
+
+        db.add(Anime(id=2, title="Trigun Stampede"))
+        db.commit()
+
+        assert get_snapshot_key(db, 1) != key
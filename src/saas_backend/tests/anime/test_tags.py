@@ -0,0 +1,70 @@
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.anime.tags import normalize_tag, replace_anime_tags
+from saas_backend.auth.models import Anime, AnimeTag
+
+
+def add_tagged_anime():
+    anime = {
+        1: ("Cowboy Bebop", 8.5, "FINISHED", False, ["Action", "Space"]),
+        2: ("Trigun", 8.0, "FINISHED", False, [" ACTION ", "Western"]),
+        3: ("Samurai Champloo", 8.7, "FINISHED", False, ["action"]),
+        4: ("Dropped From The Release", 9.9, "FINISHED", True, ["action"]),
+        5: ("Not Out Yet", 9.5, "UPCOMING", False, ["action"]),
+        6: ("Action Heroine Cheer Fruits", 6.5, "FINISHED", False, ["Idols"]),
+    }
+
+    with TestingSessionLocal() as db:
+        db.add_all(
+            Anime(id=id, title=title, rating=rating, status=status, removed=removed)
+            for id, (title, rating, status, removed, _) in anime.items()
+        )
+        db.flush()
+        replace_anime_tags(db, {id: row[4] for id, row in anime.items()})
+        db.commit()
+
+
+def search_tags(query: str, **params: int):
+    response = client.get("/anime/search/tags", params={"query": query, **params})
+    assert response.status_code == 200
+    body = response.json()
+    return body["total_count"], [anime["id"] for anime in body["animes"]]
+
+
+def test_normalize_tag():
+    assert normalize_tag("  Slice of Life ") == "slice of life"
+    assert normalize_tag("SCI-FI") == "sci-fi"
+
+
+def test_tags_are_stored_normalized_and_deduplicated():
+    add_tagged_anime()
+
+    with TestingSessionLocal() as db:
+        tags = db.query(AnimeTag.tag).filter(AnimeTag.anime_id == 2)
+        assert sorted(tag for (tag,) in tags) == ["action", "western"]
+
+
+def test_search_matches_whole_normalized_tags():
+    add_tagged_anime()
+
+    # Case and surrounding whitespace are ignored, ordered by rating
+    assert search_tags("  ACTION ") == (3, [3, 1, 2])
+    # Whole tags only, not substrings of tags or titles
+    assert search_tags("act") == (0, [])
+    assert search_tags("idols") == (1, [6])
+
+
+def test_search_leaves_out_removed_and_upcoming_anime():
+    add_tagged_anime()
+
+    total_count, ids = search_tags("action")
+
+    assert 4 not in ids and 5 not in ids
+    assert total_count == 3
+
+
+def test_total_count_covers_every_page():
+    add_tagged_anime()
+
+    assert search_tags("action", limit=2) == (3, [3, 1])
+    assert search_tags("action", limit=2, offset=2) == (3, [2])
+    assert search_tags("action", limit=2, offset=4) == (3, [])
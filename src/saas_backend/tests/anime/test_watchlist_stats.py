@@ -0,0 +1,95 @@
+from sqlalchemy import update
+
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.tests.utils.user import auth_headers
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+
+
+def add_anime():
+    with TestingSessionLocal() as db:
+        db.add_all(
+            [
+                Anime(id=1, title="Cowboy Bebop", episode_count=26, tags=["space"]),
+                Anime(
+                    id=2, title="Trigun", episode_count=26, tags=["space", "western"]
+                ),
+                Anime(id=3, title="Mushishi", episode_count=20, tags=["iyashikei"]),
+            ]
+        )
+        db.commit()
+
+
+def get_stats(headers: dict[str, str]):
+    response = client.get("/anime/stats", headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestWatchlistStats:
+    def test_empty_watchlist(self):
+        headers = auth_headers(client, "test_stats_user", "test")
+
+        assert get_stats(headers) == {
+            "total_anime_watched": 0,
+            "average_length": 0,
+            "most_common_genres": [],
+            "total_episodes": 0,
+            "status_breakdown": {},
+            "rating_histogram": {},
+        }
+
+    def test_stats_follow_watchlist_writes(self):
+        add_anime()
+        headers = auth_headers(client, "test_stats_user", "test")
+
+        _ = client.put(
+            "/anime/watchlists",
+            json={"anime": [1, 2], "request": "update", "status": "WATCHED"},
+            headers=headers,
+        )
+        _ = client.put(
+            "/anime/watchlists",
+            json={"anime": [2, 3], "request": "update", "status": "WATCHING"},
+            headers=headers,
+        )
+        _ = client.get("/anime/rate?anime_id=2&rating=8", headers=headers)
+
+        assert get_stats(headers) == {
+            "total_anime_watched": 3,
+            "average_length": 24.0,
+            "most_common_genres": [["space", 2], ["iyashikei", 1], ["western", 1]],
+            "total_episodes": 72,
+            "status_breakdown": {"WATCHED": 1, "WATCHING": 2},
+            "rating_histogram": {"8": 1},
+        }
+
+        response = client.delete("/anime/watchlists?anime_id=2", headers=headers)
+        assert response.status_code == 200
+
+        assert get_stats(headers) == {
+            "total_anime_watched": 2,
+            "average_length": 23.0,
+            "most_common_genres": [["iyashikei", 1], ["space", 1]],
+            "total_episodes": 46,
+            "status_breakdown": {"WATCHED": 1, "WATCHING": 1},
+            "rating_histogram": {},
+        }
+
+    def test_rebuilt_after_catalog_change(self):
+        add_anime()
+        headers = auth_headers(client, "test_stats_user", "test")
+
+        _ = client.put(
+            "/anime/watchlists",
+            json={"anime": [1], "request": "update", "status": "WATCHED"},
+            headers=headers,
+        )
+        assert get_stats(headers)["total_episodes"] == 26
+
+        with TestingSessionLocal() as db:
+            _ = db.execute(update(Anime).where(Anime.id == 1).values(episode_count=52))
+            _ = bump_catalog_version(db)
+            db.commit()
+
+        assert get_stats(headers)["total_episodes"] == 52
@@ -0,0 +1,138 @@
+from typing import Any
+
+import pytest
+from sqlalchemy import event, select
+
+from saas_backend.tests.conftest import (
+    TestingSessionLocal,
+    TestingAsyncSessionLocal,
+    client,
+    async_write_engine,
+)
+from saas_backend.tests.utils.user import auth_headers
+from saas_backend.anime.watchlist import upsert_watchlist_entries
+from saas_backend.auth.models import Anime, Watchlist, AnimeStatus, WatchlistToAnime
+
+
+def test_get_watchlists_joins_entries():
+    with TestingSessionLocal() as db:
+        db.add_all(
+            [
+                Anime(id=1, title="Cowboy Bebop", episode_count=26, tags=["space"]),
+                Anime(
+                    id=2, title="Trigun", episode_count=26, reccomendation_string="x"
+                ),
+            ]
+        )
+        db.commit()
+
+    headers = auth_headers(client, "test_watchlists_user", "test")
+
+    _ = client.put(
+        "/anime/watchlists",
+        json={"anime": [2, 1], "request": "update", "status": "WATCHING"},
+        headers=headers,
+    )
+    _ = client.get("/anime/rate?anime_id=2&rating=7", headers=headers)
+
+    response = client.get("/anime/watchlists", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    body = response.json()
+    assert [anime["id"] for anime in body["anime"]] == [1, 2]
+    assert body["anime"][0]["tags"] == ["space"]
+    assert body["anime"][1]["watchlist_status"] == "WATCHING"
+    assert body["anime"][1]["user_rating"] == 7
+    assert "reccomendation_string" not in body["anime"][1]
+    assert body["watchlist_id"] is not None
+
+
+@pytest.mark.asyncio
+async def test_upsert_collapses_repeated_entries():
+    # Postgres rejects an upsert that touches a row twice, SQLite doesn't, so look
+    # at the rows actually sent
+    inserted: list[Any] = []
+
+    def record(
+        _conn: Any,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        many: bool,
+    ):
+        if statement.startswith("INSERT INTO watchlist_to_anime"):
+            inserted.extend(parameters if many else [parameters])
+
+    event.listen(async_write_engine.sync_engine, "before_cursor_execute", record)
+
+    try:
+        async with TestingAsyncSessionLocal() as db:
+            db.add(Watchlist(id=1))
+            await db.flush()
+
+            await upsert_watchlist_entries(
+                db,
+                [
+                    {"watchlist_id": 1, "anime_id": 5, "status": AnimeStatus.WATCHING},
+                    {"watchlist_id": 1, "anime_id": 6, "status": AnimeStatus.WATCHING},
+                    {"watchlist_id": 1, "anime_id": 5, "status": AnimeStatus.DROPPED},
+                ],
+                update_columns=["status"],
+            )
+            await upsert_watchlist_entries(
+                db,
+                [{"watchlist_id": 1, "anime_id": 6, "status": AnimeStatus.WATCHED}],
+                update_columns=["status"],
+            )
+            await db.commit()
+
+            rows = await db.execute(
+                select(WatchlistToAnime.anime_id, WatchlistToAnime.status).order_by(
+                    WatchlistToAnime.anime_id
+                )
+            )
+            assert rows.all() == [(5, AnimeStatus.DROPPED), (6, AnimeStatus.WATCHED)]
+    finally:
+        event.remove(async_write_engine.sync_engine, "before_cursor_execute", record)
+
+    assert len(inserted) == 3
+
+
+def test_put_with_repeated_anime():
+    headers = auth_headers(client, "test_watchlists_repeat_user", "test")
+
+    response = client.put(
+        "/anime/watchlists",
+        json={"anime": [3, 3], "request": "update", "status": "WATCHED"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    with TestingSessionLocal() as db:
+        assert db.query(WatchlistToAnime).filter_by(anime_id=3).count() == 1
+
+
+def test_delete_only_touches_own_watchlist():
+    owner = auth_headers(client, "test_watchlists_owner", "test")
+    other = auth_headers(client, "test_watchlists_other", "test")
+
+    _ = client.put(
+        "/anime/watchlists",
+        json={"anime": [4], "request": "update", "status": "WATCHED"},
+        headers=owner,
+    )
+
+    response = client.delete("/anime/watchlists?anime_id=4", headers=other)
+    assert response.status_code == 404
+
+    with TestingSessionLocal() as db:
+        assert db.query(WatchlistToAnime).filter_by(anime_id=4).count() == 1
+
+    response = client.delete("/anime/watchlists?anime_id=4", headers=owner)
+    assert response.status_code == 200
+
+    with TestingSessionLocal() as db:
+        assert db.query(WatchlistToAnime).filter_by(anime_id=4).count() == 0
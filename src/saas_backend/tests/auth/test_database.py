@@ -0,0 +1,219 @@
+import sqlite3
+from typing import Any
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from collections.abc import Generator
+
+import pytest
+from sqlalchemy import delete, event, select, update
+
+from saas_backend.auth import database
+from saas_backend.auth.models import Anime, Blacklist, Watchlist, WatchlistToAnime
+from saas_backend.auth.jwt_handler.revocations import purge_expired_blacklist
+from saas_backend.tests.conftest import (
+    TestingSessionLocal,
+    TestingAsyncSessionLocal,
+    client,
+    engine,
+    async_engine,
+    async_write_engine,
+)
+from saas_backend.tests.utils.user import create_api_key, login, register
+
+
+def test_request_sessions_are_returned_to_the_pool():
+    username = "test_pool_user"
+    register(client, username, "test")
+    api_key = create_api_key(client, username, "test")
+    access_token = login(client, username, "test")
+
+    for _ in range(3):
+        assert (
+            client.get(
+                "/anime/watchlists",
+                headers={"Authorization": f"Bearer {access_token}"},
+            ).status_code
+            == 200
+        )
+        assert (
+            client.get("/anime/stats", headers={"X-API-Key": api_key}).status_code
+            == 200
+        )
+
+    pool = async_engine.sync_engine.pool
+    assert pool.checkedout() == 0  # pyright: ignore[reportAttributeAccessIssue]
+
+
+def test_health_reports_pool_status():
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json()["database_pool"]["checked_out"] == 0
+
+
+def test_sqlite_connections_use_wal():
+    with database.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_deleting_a_watchlist_deletes_its_entries():
+    with TestingSessionLocal() as db:
+        watchlist = Watchlist()
+        db.add(watchlist)
+        db.flush()
+        db.add_all(
+            WatchlistToAnime(watchlist_id=watchlist.id, anime_id=anime_id)
+            for anime_id in [1, 2]
+        )
+        db.commit()
+
+        _ = db.execute(delete(Watchlist).where(Watchlist.id == watchlist.id))
+        db.commit()
+
+        assert db.scalars(select(WatchlistToAnime)).all() == []
+
+
+@contextmanager
+def record_statements() -> Generator[dict[str, list[str]], None, None]:
+    """The first word of every statement run on the test read and write engines."""
+    statements: dict[str, list[str]] = {"read": [], "write": []}
+    listeners = {
+        name: lambda *args, name=name: statements[name].append(args[2].split()[0])
+        for name in statements
+    }
+    engines = {
+        "read": async_engine.sync_engine,
+        "write": async_write_engine.sync_engine,
+    }
+
+    for name, listener in listeners.items():
+        event.listen(engines[name], "before_cursor_execute", listener)
+
+    try:
+        yield statements
+    finally:
+        for name, listener in listeners.items():
+            event.remove(engines[name], "before_cursor_execute", listener)
+
+
+def test_writes_are_routed_to_the_write_engine():
+    reader = async_engine.sync_engine
+    writer = async_write_engine.sync_engine
+
+    with database.RoutingSession(
+        read_engine=async_engine, write_engine=async_write_engine
+    ) as session:
+        transaction = session.begin()
+        assert session.get_bind(clause=select(Anime)) is reader
+        assert session.get_bind(clause=update(Anime).values(title="")) is writer
+        # Reads in a transaction that has written see its changes
+        assert session.get_bind(clause=select(Anime)) is writer
+
+        transaction.rollback()
+        assert session.get_bind(clause=select(Anime)) is reader
+
+
+@pytest.mark.asyncio
+async def test_flushes_are_routed_to_the_write_engine():
+    # Relies on Session._flushing being set during the unit of work
+    with record_statements() as statements:
+        async with TestingAsyncSessionLocal() as db:
+            _ = await db.scalar(select(Anime.id))
+            db.add(Anime(id=1, title="Trigun"))
+            await db.flush()
+            _ = await db.scalar(select(Anime.id))
+            await db.commit()
+
+            _ = await db.scalar(select(Anime.id))
+
+    assert statements == {
+        "read": ["SELECT", "SELECT"],
+        "write": ["BEGIN", "INSERT", "SELECT"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_use_writer_moves_reads_to_the_write_engine():
+    with record_statements() as statements:
+        async with TestingAsyncSessionLocal() as db:
+            database.use_writer(db)
+            _ = await db.scalar(select(Anime.id))
+            await db.commit()
+
+            _ = await db.scalar(select(Anime.id))
+
+    assert statements == {"read": ["SELECT"], "write": ["BEGIN", "SELECT"]}
+
+
+@pytest.mark.asyncio
+async def test_write_transactions_lock_the_database_from_their_first_read():
+    other = sqlite3.connect(str(engine.url.database), timeout=0, isolation_level=None)
+
+    try:
+        async with TestingAsyncSessionLocal() as db:
+            database.use_writer(db)
+            _ = await db.scalar(select(Anime.id))
+
+            # Another process's writer can't start until this transaction ends
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                _ = other.execute("BEGIN IMMEDIATE")
+
+            await db.commit()
+
+        _ = other.execute("BEGIN IMMEDIATE")
+        _ = other.execute("ROLLBACK")
+    finally:
+        other.close()
+
+
+def test_requests_route_reads_and_writes(monkeypatch: pytest.MonkeyPatch):
+    binds: list[str] = []
+    get_bind = database.RoutingSession.get_bind
+
+    def record_bind(session: database.RoutingSession, *args: Any, **kw: Any):
+        bind = get_bind(session, *args, **kw)
+        binds.append("write" if bind is session.write_engine else "read")
+        return bind
+
+    monkeypatch.setattr(database.RoutingSession, "get_bind", record_bind)
+
+    register(client, "test_routing_user", "test")
+    headers = {"Authorization": f"Bearer {login(client, 'test_routing_user', 'test')}"}
+    _ = client.get("/anime/watchlists", headers=headers)  # creates the watchlist
+
+    binds.clear()
+    assert client.get("/anime/watchlists", headers=headers).status_code == 200
+    assert set(binds) == {"read"}
+
+    binds.clear()
+    response = client.put(
+        "/anime/watchlists",
+        json={"anime": [1], "request": "update", "status": "WATCHED"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert "write" in binds
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_blacklist():
+    now = datetime.now()
+
+    async with TestingAsyncSessionLocal() as db:
+        db.add_all(
+            [
+                Blacklist(jti=f"expired-{i}", expires_at=now - timedelta(minutes=i + 1))
+                for i in range(5)
+            ]
+            + [
+                Blacklist(jti=f"valid-{i}", expires_at=now + timedelta(minutes=i + 1))
+                for i in range(2)
+            ]
+        )
+        await db.commit()
+
+        assert await purge_expired_blacklist(db, batch_size=2) == 5
+
+        remaining = await db.scalars(select(Blacklist.jti))
+        assert sorted(remaining) == ["valid-0", "valid-1"]
@@ -1,10 +1,16 @@
+from datetime import datetime, timedelta
 from freezegun import freeze_time
-from saas_backend.tests.conftest import client
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.auth.jwt_handler.revocations import (
+    revocations,
+    unexpired_revocations,
+)
 
 from unittest.mock import patch
 import uuid
 
 from saas_backend.tests.utils.user import create_api_key, login, register
+from saas_backend.auth.user_manager.user_manager import user_cache
 
 
 class TestRegister:
@@ -106,3 +112,84 @@ class TestApiKey:
 
         assert response.status_code == 500
         assert response.json() == {"detail": "Error deleting API key"}
+
+
+class TestUserCache:
+    def test_deleted_api_key_is_rejected(self):
+        username = "test_user_cache_api_key_user"
+        register(client, username, "test")
+        api_key = create_api_key(client, username, "test")
+        access_token = login(client, username, "test")
+
+        response = client.get("/api-key", headers={"X-API-Key": api_key})
+        assert response.status_code == 200
+
+        response = client.delete(
+            "/api-key", headers={"Authorization": f"Bearer {access_token}"}
+        )
+        assert response.status_code == 200
+
+        response = client.get("/api-key", headers={"X-API-Key": api_key})
+        assert response.status_code == 401
+
+    def test_cached_token_is_rejected_once_revoked_elsewhere(self):
+        username = "test_user_cache_revoked_user"
+        register(client, username, "test")
+        access_token = login(client, username, "test")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        assert client.get("/anime/watchlists", headers=headers).status_code == 200
+        assert user_cache.get(("token", access_token)) is not None
+
+        # Another worker's logout, picked up by the revocation sync
+        revocations.revoke(access_token, datetime.now() + timedelta(minutes=5))
+
+        assert client.get("/anime/watchlists", headers=headers).status_code == 401
+
+    def test_password_hash_is_not_cached(self):
+        username = "test_user_cache_password_user"
+        register(client, username, "test")
+        access_token = login(client, username, "test")
+
+        response = client.get(
+            "/anime/watchlists", headers={"Authorization": f"Bearer {access_token}"}
+        )
+        assert response.status_code == 200
+
+        cached = user_cache.get(("token", access_token))
+        assert cached is not None and cached["username"] == username
+        assert "hashed_password" not in cached
+
+
+class TestLogout:
+    def test_logged_out_token_is_rejected(self):
+        username = "test_logout_user"
+        register(client, username, "test")
+        access_token = login(client, username, "test")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        assert client.get("/anime/watchlists", headers=headers).status_code == 200
+
+        response = client.post("/logout", headers=headers)
+        assert response.status_code == 200
+
+        response = client.get("/anime/watchlists", headers=headers)
+        assert response.status_code == 401
+
+        # Logging out again succeeds and keeps the token revoked
+        assert client.post("/logout", headers=headers).status_code == 200
+        assert client.get("/anime/watchlists", headers=headers).status_code == 401
+
+    def test_revocations_are_loaded_from_the_blacklist(self):
+        username = "test_logout_reload_user"
+        register(client, username, "test")
+        access_token = login(client, username, "test")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        _ = client.post("/logout", headers=headers)
+
+        revocations.clear()
+        with TestingSessionLocal() as db:
+            revocations.load(db.execute(unexpired_revocations()))
+
+        assert client.get("/anime/watchlists", headers=headers).status_code == 401
@@ -1,15 +1,60 @@
-from unittest.mock import patch
+import os
+import atexit
+import shutil
+import tempfile
 import pytest
+from pathlib import Path
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
-from collections.abc import Generator
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from collections.abc import Generator, AsyncGenerator
+
+# Set before the app is imported, as importing it already builds the catalog caches
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="saas-backend-tests-")
+atexit.register(shutil.rmtree, TEST_DATA_DIR, ignore_errors=True)
+os.environ["CATALOG_SNAPSHOT_DIR"] = os.path.join(TEST_DATA_DIR, "catalog-snapshots")
+os.environ["SIMILARITY_INDEX_PATH"] = os.path.join(
+    TEST_DATA_DIR, "similarity-index.npz"
+)
 
 from saas_backend.app import app
-from saas_backend.auth.database import Base, get_db
+from saas_backend.auth.database import (
+    Base,
+    RoutingSession,
+    get_db,
+    get_async_db,
+    begin_immediate,
+    apply_sqlite_pragmas,
+)
+from saas_backend.auth.user_manager.user_manager import user_cache
+from saas_backend.auth.jwt_handler.revocations import revocations
+from saas_backend.integrations.router import lookup_cache
+from saas_backend.anime import snapshot
+from saas_backend.anime.compute import compute, init_worker
+from saas_backend.anime.recommender import recommendation_engine, similarity_index_store
+from saas_backend.anime.search_index import title_index
 
 engine = create_engine("sqlite:///test.db")
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Set up like the app's engines: reads use the pool, writes queue on one connection
+async_engine = create_async_engine("sqlite+aiosqlite:///test.db")
+async_write_engine = create_async_engine(
+    "sqlite+aiosqlite:///test.db", pool_size=1, max_overflow=0
+)
+
+for test_engine in [engine, async_engine.sync_engine, async_write_engine.sync_engine]:
+    apply_sqlite_pragmas(test_engine)
+
+begin_immediate(async_write_engine.sync_engine)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    read_engine=async_engine,
+    write_engine=async_write_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 
 def db_session() -> Generator[Session, None, None]:
@@ -20,36 +65,38 @@ def db_session() -> Generator[Session, None, None]:
         db.close()
 
 
+async def async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 client = TestClient(app)
 
+# Search and recommendations run on a thread against the test database
+compute.workers = 0
+init_worker("sqlite:///test.db", pooled=False)
+
 
 @pytest.fixture(scope="function", autouse=True)
 def override_get_db():
     app.dependency_overrides[get_db] = db_session
+    app.dependency_overrides[get_async_db] = async_db_session
     yield
     _ = app.dependency_overrides.pop(get_db, None)
+    _ = app.dependency_overrides.pop(get_async_db, None)
 
 
 @pytest.fixture(scope="function", autouse=True)
-def mock_router_get_db():
-    with patch("saas_backend.auth.router.get_db", side_effect=db_session):
-        yield
-
-
-@pytest.fixture(scope="function", autouse=True)
-def mock_user_manager_get_db():
-    with patch(
-        "saas_backend.auth.user_manager.user_manager.get_db", side_effect=db_session
-    ):
-        yield
-
+def isolate_data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # Keep catalog snapshots and the similarity index out of the app's ./data, in
+    # this process and in any compute worker it spawns
+    snapshot_dir = str(tmp_path / "catalog-snapshots")
+    similarity_index_path = str(tmp_path / "similarity-index.npz")
 
-@pytest.fixture(scope="function", autouse=True)
-def mock_jwt_handler_get_db():
-    with patch(
-        "saas_backend.auth.jwt_handler.jwt_handler.get_db", side_effect=db_session
-    ):
-        yield
+    monkeypatch.setenv("CATALOG_SNAPSHOT_DIR", snapshot_dir)
+    monkeypatch.setenv("SIMILARITY_INDEX_PATH", similarity_index_path)
+    monkeypatch.setattr(snapshot, "CATALOG_SNAPSHOT_DIR", snapshot_dir)
+    monkeypatch.setattr(similarity_index_store, "path", similarity_index_path)
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -58,3 +105,9 @@ def setup_database():
 
     yield
     Base.metadata.drop_all(bind=engine)
+    user_cache.clear()
+    revocations.clear()
+    lookup_cache.clear()
+    # Every test's catalog starts again at version 0
+    title_index.clear()
+    recommendation_engine.clear()
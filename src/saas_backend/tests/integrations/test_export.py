@@ -0,0 +1,81 @@
+import json
+import zlib
+from typing import Any
+
+import pytest
+
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.tests.utils.user import auth_headers
+from saas_backend.auth.models import Anime
+
+
+@pytest.fixture
+def headers():
+    with TestingSessionLocal() as db:
+        db.add_all(
+            [
+                Anime(id=1, title="Cowboy Bebop", status="FINISHED", episode_count=26),
+                Anime(id=2, title="Trigun", status="FINISHED", episode_count=26),
+            ]
+        )
+        db.commit()
+
+    headers = auth_headers(client, "test_export_user", "test")
+
+    _ = client.put(
+        "/anime/watchlists",
+        json={"anime": [1, 2], "request": "update", "status": "WATCHING"},
+        headers=headers,
+    )
+    _ = client.get("/anime/rate?anime_id=2&rating=9", headers=headers)
+
+    return headers
+
+
+def entries(watchlist: list[dict[str, Any]]):
+    return [(a["id"], a["title"], a["status"], a["user_rating"]) for a in watchlist]
+
+
+class TestExport:
+    def test_json(self, headers: dict[str, str]):
+        response = client.get("/integrations/export", headers=headers)
+
+        assert response.status_code == 200
+        assert entries(response.json()["watchlist"]) == [
+            (1, "Cowboy Bebop", "WATCHING", None),
+            (2, "Trigun", "WATCHING", 9),
+        ]
+
+    def test_gzipped_ndjson(self, headers: dict[str, str]):
+        response = client.get(
+            "/integrations/export?format=ndjson&gzip=true", headers=headers
+        )
+
+        assert response.headers["content-type"] == "application/gzip"
+        assert "watchlist.ndjson.gz" in response.headers["content-disposition"]
+
+        lines = zlib.decompress(response.content, wbits=31).splitlines()
+        assert entries([json.loads(line) for line in lines]) == [
+            (1, "Cowboy Bebop", "WATCHING", None),
+            (2, "Trigun", "WATCHING", 9),
+        ]
+
+    def test_import_reads_every_format(self, headers: dict[str, str]):
+        exported = client.get(
+            "/integrations/export?format=ndjson&gzip=true", headers=headers
+        ).content
+
+        other = auth_headers(client, "test_import_user", "test")
+
+        response = client.post(
+            "/integrations/import",
+            files={"file": ("watchlist.ndjson.gz", exported)},
+            headers=other,
+        )
+        assert response.status_code == 200
+
+        imported = client.get("/integrations/export", headers=other).json()
+        assert entries(imported["watchlist"]) == [
+            (1, "Cowboy Bebop", "WATCHING", None),
+            (2, "Trigun", "WATCHING", 9),
+        ]
@@ -0,0 +1,100 @@
+from typing import Any
+from collections.abc import Callable
+
+import pytest
+
+from saas_backend.tests.conftest import TestingSessionLocal, client
+from saas_backend.tests.utils.user import auth_headers
+from saas_backend.auth.models import Anime
+from saas_backend.anime.compute import compute
+
+MAL_EXPORT = b"""<?xml version="1.0" encoding="UTF-8" ?>
+<myanimelist>
+    <myinfo><user_name>test</user_name></myinfo>
+    <anime>
+        <series_title><![CDATA[Cowboy Bebop]]></series_title>
+        <my_score>9</my_score>
+        <my_status>Completed</my_status>
+    </anime>
+    <anime>
+        <series_title><![CDATA[Trigun Stampede]]></series_title>
+        <my_score>0</my_score>
+        <my_status>Plan to Watch</my_status>
+    </anime>
+    <anime>
+        <series_title><![CDATA[cowboy bebop!]]></series_title>
+        <my_score>8</my_score>
+        <my_status>Completed</my_status>
+    </anime>
+    <anime>
+        <series_title><![CDATA[Not In The Catalog]]></series_title>
+        <my_score>5</my_score>
+        <my_status>Dropped</my_status>
+    </anime>
+</myanimelist>
+"""
+
+
+class TestMalUpload:
+    def test_match_report(self):
+        with TestingSessionLocal() as db:
+            db.add_all(
+                [
+                    Anime(id=1, title="Cowboy Bebop", extra_titles=[]),
+                    Anime(id=2, title="Trigun", extra_titles=["Trigun Stampede"]),
+                ]
+            )
+            db.commit()
+
+        headers = auth_headers(client, "test_mal_user", "test")
+        response = client.post(
+            "/integrations/upload",
+            files={"file": ("animelist.xml", MAL_EXPORT)},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "message": "XML file converted to watchlist",
+            "total": 4,
+            "matched_by_title": 1,
+            "matched_by_synonym": 1,
+            "duplicates": 1,
+            "unmatched": ["Not In The Catalog"],
+        }
+
+        watchlist = client.get("/anime/watchlists", headers=headers).json()["anime"]
+        assert [
+            (anime["id"], anime["watchlist_status"], anime["user_rating"])
+            for anime in watchlist
+        ] == [(1, "WATCHED", 8), (2, "PLANNING", 0)]
+
+    def test_titles_are_matched_by_the_compute_pool(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        calls: list[str] = []
+        run = compute.run
+
+        async def record(function: Callable[..., Any], *args: Any) -> Any:
+            calls.append(function.__name__)
+            return await run(function, *args)
+
+        monkeypatch.setattr(compute, "run", record)
+
+        response = client.post(
+            "/integrations/upload",
+            files={"file": ("animelist.xml", MAL_EXPORT)},
+            headers=auth_headers(client, "test_mal_user", "test"),
+        )
+
+        assert response.status_code == 200
+        assert calls == ["match_titles"]
+
+    def test_invalid_file(self):
+        response = client.post(
+            "/integrations/upload",
+            files={"file": ("animelist.xml", b"<myanimelist>")},
+            headers=auth_headers(client, "test_mal_user", "test"),
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,117 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from saas_backend.tests.conftest import client
+from saas_backend.config import Config
+from saas_backend.integrations import router
+from saas_backend.integrations.upstream import UpstreamClient
+
+
+def stub_arr(failures: int = 0):
+    """A stand-in Sonarr that answers 503 to its first `failures` requests."""
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+
+    @app.api_route("/api/v3/series/lookup", methods=["GET", "POST"])
+    async def lookup(term: str = ""):
+        app.state.calls += 1
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+        await asyncio.sleep(0.01)
+        app.state.in_flight -= 1
+
+        if app.state.calls <= failures:
+            return Response(status_code=503)
+
+        return [{"title": term}]
+
+    return app
+
+
+def stub_client(app: FastAPI, **kwargs):
+    return UpstreamClient(backoff=0, transport=httpx.ASGITransport(app), **kwargs)
+
+
+URL = "http://sonarr/api/v3/series/lookup"
+
+
+def use_config(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        router,
+        "get_config",
+        lambda: Config(sections={"sonarr": {"url": "http://sonarr", "api_key": "k"}}),
+    )
+
+
+class TestUpstreamClient:
+    @pytest.mark.asyncio
+    async def test_retries_idempotent_requests(self):
+        app = stub_arr(failures=2)
+        response = await stub_client(app, retries=2).get(URL, params={"term": "a"})
+
+        assert response.status_code == 200
+        assert app.state.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_posts_that_got_a_response(self):
+        app = stub_arr(failures=1)
+        response = await stub_client(app, retries=2).post(URL)
+
+        assert response.status_code == 503
+        assert app.state.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_bounds_concurrency(self):
+        app = stub_arr()
+        upstream = stub_client(app, max_concurrency=2)
+
+        _ = await asyncio.gather(*(upstream.get(URL) for _ in range(6)))
+
+        assert app.state.calls == 6
+        assert app.state.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_gives_up_on_connection_errors(self):
+        def refuse(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        upstream = UpstreamClient(backoff=0, transport=httpx.MockTransport(refuse))
+
+        with pytest.raises(httpx.ConnectError):
+            _ = await upstream.get(URL)
+
+
+def test_sonarr_search_route(monkeypatch: pytest.MonkeyPatch):
+    use_config(monkeypatch)
+    app = stub_arr(failures=1)
+    monkeypatch.setattr(router, "upstream", stub_client(app))
+
+    response = client.get("/integrations/sonarr/search?query=Bebop")
+
+    assert response.status_code == 200
+    assert response.json() == [{"title": "bebop"}]
+
+    # Served from the lookup cache, the query is normalized first
+    response = client.get("/integrations/sonarr/search?query=%20bebop%20")
+
+    assert response.json() == [{"title": "bebop"}]
+    assert app.state.calls == 2
+
+
+def test_unreachable_upstream_route(monkeypatch: pytest.MonkeyPatch):
+    def refuse(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    use_config(monkeypatch)
+    monkeypatch.setattr(
+        router,
+        "upstream",
+        UpstreamClient(retries=0, transport=httpx.MockTransport(refuse)),
+    )
+
+    assert client.get("/integrations/sonarr/search?query=bebop").status_code == 502
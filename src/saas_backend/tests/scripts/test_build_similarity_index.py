@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import saas_backend.scripts.build_similarity_index as builder
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.anime.catalog import bump_catalog_version
+from saas_backend.auth.models import Anime
+from saas_backend.anime.recommender import SimilarityIndexStore, recommend
+
+CORPUS = {
+    1: "space cowboy bounty hunter",
+    2: "space western cowboy gunman",
+    3: "space forest spirits",
+    4: "quiet forest spirits mushi",
+}
+
+
+@pytest.fixture(autouse=True)
+def test_session(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(builder, "SessionLocal", TestingSessionLocal)
+
+
+def add_catalog(corpus: dict[int, str]):
+    with TestingSessionLocal() as db:
+        db.add_all(
+            Anime(id=anime_id, title=str(anime_id), reccomendation_string=text)
+            for anime_id, text in corpus.items()
+        )
+        _ = bump_catalog_version(db)
+        db.commit()
+
+
+def test_index_is_built_and_reloaded(tmp_path: Path):
+    path = str(tmp_path / "similarity-index.npz")
+    store = SimilarityIndexStore(path)
+    add_catalog(CORPUS)
+
+    assert store.get(1) is None  # not built yet
+
+    builder.build_similarity_index(path, top_k=2, chunk_size=3)
+    index = store.get(1)
+
+    assert index is not None
+    assert index.anime_ids.tolist() == [1, 2, 3, 4]
+    assert index.neighbours.shape == (4, 2)
+    assert index.neighbours[0].tolist() == [1, 2]  # best first, never itself
+    assert index.neighbours[3][0] == 2
+    assert (index.scores[:, 0] >= index.scores[:, 1]).all()
+    assert recommend(index, [(1, 1.0)], [], 1) == [2]
+
+    # A stale index is ignored until it is rebuilt for the new version
+    add_catalog({5: "forest spirits mushi"})
+    assert store.get(2) is None
+
+    builder.build_similarity_index(path, top_k=10)
+    os.utime(path, (0, 0))  # a new mtime, even on coarse clocks
+
+    index = store.get(2)
+    assert index is not None and index.neighbours.shape == (5, 4)
+    assert recommend(index, [(5, 1.0)], [], 1) == [4]
@@ -0,0 +1,63 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import saas_backend.scripts.load_database as loader
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.tests.utils.offline_database import offline_entry, write_release
+from saas_backend.anime.catalog import get_catalog_version
+from saas_backend.auth.models import Anime, AnimeTag
+
+
+@pytest.fixture(autouse=True)
+def test_session(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(loader, "SessionLocal", TestingSessionLocal)
+
+
+def test_values_span_buffer_boundaries(tmp_path: Path):
+    entries = [offline_entry(number) for number in range(1, 6)]
+    path = write_release(tmp_path, entries)
+
+    for buffer_size in (1, 3, 7, 64):
+        assert list(loader.iter_offline_database(path, buffer_size)) == entries
+
+
+def test_empty_data_array(tmp_path: Path):
+    path = tmp_path / "anime-offline-database.json"
+    path.write_text('{"data": [ ], "lastUpdate": "2026-10-18"}')
+
+    assert list(loader.iter_offline_database(str(path), buffer_size=4)) == []
+
+
+def test_load_database_inserts_in_chunks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    path = write_release(tmp_path, [offline_entry(number) for number in range(1, 6)])
+
+    chunks: list[int] = []
+    insert_anime_rows = loader.insert_anime_rows
+
+    def record_chunk(connection: Any, rows: list[dict[str, Any]]):
+        chunks.append(len(rows))
+        insert_anime_rows(connection, rows)
+
+    monkeypatch.setattr(loader, "insert_anime_rows", record_chunk)
+
+    loader.load_database(path, chunk_size=2)
+
+    assert chunks == [2, 2, 1]
+
+    with TestingSessionLocal() as db:
+        assert [row.id for row in db.query(Anime.id).order_by(Anime.id)] == [
+            1,
+            2,
+            3,
+            4,
+            5,
+        ]
+        assert db.query(AnimeTag).count() == 10
+        assert (
+            db.get(Anime, 3).episode_count == 36
+        )  # pyright: ignore[reportOptionalMemberAccess]
+        assert get_catalog_version(db) == 1
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import saas_backend.scripts.load_database as loader
+import saas_backend.scripts.refresh_database as refresher
+from saas_backend.tests.conftest import TestingSessionLocal
+from saas_backend.tests.utils.offline_database import offline_entry, write_release
+from saas_backend.anime.catalog import get_catalog_version
+from saas_backend.auth.models import Anime, AnimeTag
+
+
+@pytest.fixture(autouse=True)
+def test_session(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(loader, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(refresher, "SessionLocal", TestingSessionLocal)
+
+
+def catalog() -> dict[int, tuple[Any, ...]]:
+    with TestingSessionLocal() as db:
+        return {
+            row.id: (row.title, row.removed)
+            for row in db.query(Anime.id, Anime.title, Anime.removed)
+        }
+
+
+def tags(anime_id: int) -> list[str]:
+    with TestingSessionLocal() as db:
+        return sorted(
+            tag for (tag,) in db.query(AnimeTag.tag).filter_by(anime_id=anime_id)
+        )
+
+
+def version() -> int:
+    with TestingSessionLocal() as db:
+        return get_catalog_version(db)
+
+
+def test_refresh_applies_a_release(tmp_path: Path):
+    loader.load_database(
+        write_release(tmp_path, [offline_entry(number) for number in (1, 2, 3)])
+    )
+    assert version() == 1
+
+    renamed = {**offline_entry(1), "title": "Anime 1 (TV)"}
+    # Matched by a source URL even when the release lists more of them
+    renamed["sources"] = ["https://anidb.net/anime/1", *renamed["sources"]]
+    added = {**offline_entry(4), "tags": ["Slice of Life", " slice of life "]}
+    release = write_release(tmp_path, [added, offline_entry(2), renamed])
+
+    refresher.refresh_database(release, chunk_size=2)
+
+    assert catalog() == {
+        1: ("Anime 1 (TV)", False),
+        2: ("Anime 2 ☆", False),
+        3: ("Anime 3 ☆", True),
+        4: ("Anime 4 ☆", False),
+    }
+    assert tags(4) == ["slice of life"]
+    assert version() == 2
+
+    # The same release again changes nothing
+    refresher.refresh_database(release, chunk_size=2)
+
+    assert version() == 2
+
+    # A removed anime listed again is restored under its old id
+    refresher.refresh_database(
+        write_release(tmp_path, [renamed, offline_entry(2), offline_entry(3), added])
+    )
+
+    assert catalog()[3] == ("Anime 3 ☆", False)
+    assert tags(3) == ["action", "tag 3"]
+    assert len(catalog()) == 4
+    assert version() == 3
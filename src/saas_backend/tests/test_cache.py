@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from freezegun import freeze_time
+
+from saas_backend.cache import TTLCache, AsyncLoadingCache
+
+
+def test_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire():
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+
+    with freeze_time("2024-01-01 00:00:00") as frozen:
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=10)
+        cache.set("c", 3, ttl=-1)  # already expired, not stored
+
+        frozen.tick(30)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") is None
+
+        frozen.tick(31)
+
+        assert cache.get("a") is None
+
+
+def test_discard_where():
+    cache: TTLCache[str, dict[str, int]] = TTLCache(maxsize=10, ttl=60)
+    cache.set("token", {"id": 1})
+    cache.set("api_key", {"id": 1})
+    cache.set("other", {"id": 2})
+
+    assert cache.discard_where(lambda user: user["id"] == 1) == 2
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache: AsyncLoadingCache[str, int] = AsyncLoadingCache(maxsize=10, ttl=60)
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    assert await asyncio.gather(*(cache.get("a", load) for _ in range(5))) == [42] * 5
+    assert await cache.get("a", load) == 42
+
+    assert loads == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "coalesced": 4}
+
+
+@pytest.mark.asyncio
+async def test_failed_loads_are_not_cached():
+    cache: AsyncLoadingCache[str, int] = AsyncLoadingCache(maxsize=10, ttl=60)
+
+    async def fail() -> int:
+        raise ValueError("upstream down")
+
+    async def load():
+        return 1
+
+    with pytest.raises(ValueError):
+        _ = await cache.get("a", fail)
+
+    assert await cache.get("a", load) == 1
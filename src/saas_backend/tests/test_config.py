@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from saas_backend.config import ConfigLoader, IntegrationConfig
+from saas_backend.tests.conftest import client
+from saas_backend.integrations import router
+
+
+def write(path: str, text: str, mtime_ns: int):
+    with open(path, "w") as f:
+        _ = f.write(text)
+
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_parses_once_and_reloads_on_change(tmp_path: Path):
+    path = os.path.join(tmp_path, "config.yaml")
+    write(path, "sonarr:\n  url: http://sonarr:8989/\n  api_key: abc\n", 1)
+    loader = ConfigLoader(path)
+
+    config = loader.get()
+    assert loader.get() is config
+    assert config.sonarr == IntegrationConfig(url="http://sonarr:8989", api_key="abc")
+    assert config.radarr is None
+
+    with pytest.raises(TypeError):
+        config.sections["sonarr"]["url"] = "http://elsewhere"  # type: ignore
+
+    write(path, "radarr:\n  url: http://radarr:7878\n  api_key: def\n", 2)
+
+    assert loader.get().radarr == IntegrationConfig("http://radarr:7878", "def")
+    assert loader.get().sonarr is None
+
+    reloaded = loader.reload()
+    assert reloaded is not config and loader.get() is reloaded
+
+
+def test_missing_file(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        _ = ConfigLoader(os.path.join(tmp_path, "config.yaml")).get()
+
+
+def test_settings_lists_configured_integrations(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    path = os.path.join(tmp_path, "config.yaml")
+    write(
+        path, "sonarr:\n  url: http://sonarr\n  api_key: abc\njellyfin:\n  a: [1]\n", 1
+    )
+    monkeypatch.setattr(router, "get_config", ConfigLoader(path).get)
+
+    assert client.get("/integrations/settings").json() == ["sonarr", "jellyfin"]
+    assert client.get("/integrations/jellyfin").json() == {"a": [1]}
+    assert client.get("/integrations/radarr/search?query=x").status_code == 404
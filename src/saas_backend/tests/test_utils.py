@@ -0,0 +1,13 @@
+import json
+
+import pytest
+
+from saas_backend.utils import stream_json
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 7])
+def test_stream_json_chunks_form_one_document(count: int):
+    chunks = list(stream_json({"user_id": 1}, "anime", range(count), chunk_size=3))
+
+    assert json.loads(b"".join(chunks)) == {"user_id": 1, "anime": list(range(count))}
+    assert len(chunks) == 2 + -(-count // 3)
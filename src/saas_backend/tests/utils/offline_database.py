@@ -0,0 +1,21 @@
+import json
+from pathlib import Path
+from typing import Any
+
+
+def offline_entry(number: int) -> dict[str, Any]:
+    return {
+        "sources": [f"https://myanimelist.net/anime/{number}"],
+        "title": f"Anime {number} ☆",
+        "episodes": 12 * number,
+        "tags": ["action", f"tag {number}"],
+        "synonyms": [f"Synonym {number}"],
+        "score": {"median": 7.25 + number},
+    }
+
+
+def write_release(tmp_path: Path, entries: list[dict[str, Any]]) -> str:
+    path = tmp_path / "anime-offline-database.json"
+    release = {"$schema": "x", "lastUpdate": "2026-10-18", "data": entries}
+    path.write_text(json.dumps(release, indent=2) + "\n  ")
+    return str(path)
@@ -19,3 +19,9 @@ def create_api_key(client: TestClient, username: str, password: str):
         "/api-key", headers={"Authorization": f"Bearer {access_token}"}
     )
     return response.json()["api_key"]
+
+
+def auth_headers(client: TestClient, username: str, password: str):
+    register(client, username, password)
+    access_token = login(client, username, password)
+    return {"Authorization": f"Bearer {access_token}"}
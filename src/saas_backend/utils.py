@@ -1,17 +1,92 @@
+import zlib
 from typing import Any
-import yaml
+from collections.abc import (
+    Iterable,
+    Iterator,
+    Sequence,
+    AsyncIterable,
+    AsyncIterator,
+)
+import orjson
+
+from saas_backend.config import get_config
+
+# Items serialized per chunk of a streamed JSON response
+JSON_CHUNK_SIZE = 500
 
 
 def to_dict(obj: Any):
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
 
-def read_config(config_name: str):
-    try:
-        with open("config.yaml", "r") as f:
-            config = yaml.safe_load(f)
+def _encode_items(items: Sequence[Any], first: bool) -> bytes:
+    """The items as the inside of a JSON array, led by a comma unless `first`."""
+    return (b"" if first else b",") + orjson.dumps(items)[1:-1]
+
+
+def stream_json(
+    content: dict[str, Any],
+    key: str,
+    items: Iterable[Any],
+    chunk_size: int = JSON_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Serialize `{**content, key: [*items]}` with orjson, yielding it `chunk_size`
+    items at a time, for a StreamingResponse with media_type="application/json".
+    """
+    yield orjson.dumps({**content, key: []})[:-2]  # up to the opening bracket
+
+    chunk: list[Any] = []
+    first = True
+
+    for item in items:
+        chunk.append(item)
+
+        if len(chunk) == chunk_size:
+            yield _encode_items(chunk, first)
+            chunk, first = [], False
+
+    if chunk:
+        yield _encode_items(chunk, first)
+
+    yield b"]}"
+
 
-    except FileNotFoundError:
-        raise FileNotFoundError("config.yaml not found")
+async def astream_json(
+    content: dict[str, Any], key: str, chunks: AsyncIterable[Sequence[Any]]
+) -> AsyncIterator[bytes]:
+    """stream_json for items arriving in chunks, e.g. `AsyncResult.partitions()`."""
+    yield orjson.dumps({**content, key: []})[:-2]
 
-    return config.get(config_name)
+    first = True
+
+    async for chunk in chunks:
+        if chunk:
+            yield _encode_items(chunk, first)
+            first = False
+
+    yield b"]}"
+
+
+async def astream_ndjson(chunks: AsyncIterable[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """One JSON document per line and item."""
+    async for chunk in chunks:
+        yield b"".join(
+            orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in chunk
+        )
+
+
+async def agzip(stream: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15, gzip container
+
+    async for data in stream:
+        if compressed := compressor.compress(data):
+            yield compressed
+
+    yield compressor.flush()
+
+
+def read_config(config_name: str):
+    """A section of config.yaml, see saas_backend.config for the cached loader."""
+    return get_config().section(config_name)